@@ -0,0 +1,123 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+from posts.utils import encode_cursor
+from yatube.settings import QUANTITY
+
+POSTS_QUANTITY = 13
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        cls.follower = User.objects.create_user(username='Alice')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        for number in range(POSTS_QUANTITY):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Пост {number}',
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+
+    def test_feeds_paginate_by_cursor(self):
+        """Ленты API отдают страницы по курсору."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('api:profile', kwargs={'username': self.user}),
+            reverse('api:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url).json()
+                self.assertEqual(len(first['results']), QUANTITY)
+                self.assertIsNone(first['previous'])
+                second = self.authorized_client.get(
+                    url, {'after': first['next']}).json()
+                self.assertEqual(
+                    len(second['results']), POSTS_QUANTITY - QUANTITY)
+                self.assertIsNone(second['next'])
+
+    def test_sparse_fields(self):
+        """Параметр fields ограничивает поля и отвергает неизвестные."""
+        url = reverse('api:index')
+        with self.assertNumQueries(1) as context:
+            response = self.client.get(url, {'fields': 'id,text'})
+        self.assertEqual(
+            set(response.json()['results'][0]), {'id', 'text'})
+        sql = context.captured_queries[0]['sql']
+        self.assertIn('"text"', sql)
+        self.assertNotIn('"image"', sql)
+        self.assertNotIn('"comments_count"', sql)
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_follow_requires_login(self):
+        """Лента подписок API недоступна анониму."""
+        response = self.client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_profile_export_streams_all_posts(self):
+        """Выгрузка отдаёт все посты автора в порядке публикации."""
+        response = self.client.get(
+            reverse('api:profile_export', kwargs={'username': self.user}))
+        self.assertTrue(response.streaming)
+        posts = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(posts), POSTS_QUANTITY)
+        self.assertEqual(posts[0]['text'], 'Пост 0')
+        self.assertEqual(posts[0]['author'], self.user.username)
+
+    def test_following_field(self):
+        """Поле following отмечает авторов, на которых подписан читатель."""
+        url = reverse('api:index')
+        params = {'fields': 'id,following'}
+        results = self.authorized_client.get(url, params).json()['results']
+        self.assertTrue(all(post['following'] for post in results))
+        results = self.client.get(url, params).json()['results']
+        self.assertFalse(any(post['following'] for post in results))
+
+    def test_new_posts_since_cursor(self):
+        """Новые посты отдаются по курсору, без новых - без запросов."""
+        cache.clear()
+        url = reverse('api:new_posts')
+        first = self.client.get(url, {'fields': 'id'}).status_code
+        self.assertEqual(first, 400)
+        latest = self.client.get(reverse('api:index')).json()['results'][0]
+        newest = Post.objects.get(pk=latest['id'])
+        since = encode_cursor(newest)
+        params = {'since': since, 'group': self.group.pk}
+        self.client.get(url, params)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, params).json()
+        self.assertEqual(response['results'], [])
+        self.assertEqual(response['latest'], since)
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            post = Post.objects.create(
+                author=self.user, text='Новый пост', group=self.group)
+        # До фиксации транзакции курсор в кеше не сбрасывается.
+        response = self.client.get(url, params).json()
+        self.assertEqual(response['results'], [])
+        for (callback,), _ in on_commit.call_args_list:
+            callback()
+        response = self.client.get(url, params).json()
+        self.assertEqual(
+            [item['id'] for item in response['results']], [post.pk])
+        self.assertEqual(response['latest'], encode_cursor(post))
+        self.assertFalse(response['more'])
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.index, name='index'),
+    path('posts/new/', views.new_posts, name='new_posts'),
+    path('groups/<slug:slug>/posts/', views.group_posts, name='group_posts'),
+    path('profile/<str:username>/posts/', views.profile, name='profile'),
+    path('profile/<str:username>/export/', views.profile_export,
+         name='profile_export'),
+    path('follow/posts/', views.follow_index, name='follow_index'),
+]
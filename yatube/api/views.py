@@ -0,0 +1,193 @@
+"""JSON API только для чтения: ленты с курсорами и выгрузка постов автора.
+
+Параметр fields=id,text,... ограничивает набор полей, after и before -
+курсоры из ответа предыдущей страницы. Поле following показывает,
+подписан ли текущий пользователь на автора поста.
+"""
+from functools import partial
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from core.queries import query_budget
+from posts.feed import feed_page
+from posts.follows import followed_among, is_following
+from posts.models import Group, Post, User
+from posts.cache import latest_key
+from posts.utils import (
+    cursor_page, decode_cursor, new_posts_scope, newer_than,
+)
+
+FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date,
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+    'comments_count': lambda post: post.comments_count,
+    'following': lambda post: post.following,
+}
+# Столбцы для .only(): pub_date и id нужны курсору всегда, поля через
+# '__' читаются соединением со связанной моделью.
+COLUMNS = {
+    'id': (),
+    'text': ('text',),
+    'pub_date': (),
+    'author': ('author', 'author__username'),
+    'group': ('group', 'group__slug'),
+    'image': ('image',),
+    'comments_count': ('comments_count',),
+    'following': ('author',),
+}
+# Поля, для которых нужна связанная модель.
+RELATED = ('author', 'group')
+EXPORT_CHUNK_SIZE = 500
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def error(message, status):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def requested_fields(request):
+    value = request.GET.get('fields')
+    if not value:
+        return list(FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def serialize(post, fields):
+    return {field: FIELDS[field](post) for field in fields}
+
+
+def select_fields(queryset, fields):
+    """Читает только столбцы и таблицы запрошенных полей."""
+    columns = {'pub_date'}
+    for field in fields:
+        columns.update(COLUMNS[field])
+    related = [field for field in RELATED if field in fields]
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+
+def mark_following(posts, user):
+    """Проверяет подписку на авторов всей страницы разом."""
+    followed = followed_among(user.pk, {post.author_id for post in posts})
+    for post in posts:
+        post.following = post.author_id in followed
+
+
+def feed_response(request, queryset, paginate=cursor_page):
+    try:
+        fields = requested_fields(request)
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    page = paginate(
+        select_fields(queryset, fields),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    if 'following' in fields:
+        mark_following(page.object_list, request.user)
+    return JsonResponse({
+        'results': [serialize(post, fields) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@query_budget(4)
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@query_budget(4)
+def new_posts(request):
+    """Посты новее курсора since; group - id группы.
+
+    Без новых постов ответ собирается из кеша без запросов к базе.
+    """
+    try:
+        fields = requested_fields(request)
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    since = request.GET.get('since')
+    group_id = request.GET.get('group', '')
+    if decode_cursor(since) is None:
+        return error('Некорректный курсор since.', 400)
+    if group_id and not group_id.isdigit():
+        return error('Некорректный id группы.', 400)
+    scope, queryset = new_posts_scope(group_id)
+    posts, latest, more = newer_than(
+        select_fields(queryset, fields), since, latest_key(scope))
+    if posts and 'following' in fields:
+        mark_following(posts, request.user)
+    return JsonResponse({
+        'results': [serialize(post, fields) for post in posts],
+        'latest': latest,
+        'more': more,
+    })
+
+
+@query_budget(4)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error('Группа не найдена.', 404)
+    return feed_response(request, group.posts.all())
+
+
+@query_budget(4)
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error('Пользователь не найден.', 404)
+    return feed_response(request, author.posts.all())
+
+
+@query_budget(6)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error('Требуется авторизация.', 401)
+    return feed_response(
+        request, Post.objects.all(), partial(feed_page, request.user))
+
+
+def export_chunks(queryset, fields, following=False):
+    """JSON-массив постов по частям без загрузки всей выборки в память."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield '['
+    separator = ''
+    for post in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        post.following = following
+        yield separator + encoder.encode(serialize(post, fields))
+        separator = ','
+    yield ']'
+
+
+def profile_export(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error('Пользователь не найден.', 404)
+    try:
+        fields = requested_fields(request)
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    queryset = select_fields(author.posts.order_by('pub_date', 'pk'), fields)
+    response = StreamingHttpResponse(
+        export_chunks(
+            queryset, fields, is_following(request.user.pk, author.pk)),
+        content_type='application/json; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}-posts.json"')
+    return response
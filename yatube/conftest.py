@@ -0,0 +1,11 @@
+import pytest
+from django.test import override_settings
+
+from core.testing import TEST_CACHES
+
+
+@pytest.fixture(autouse=True, scope='session')
+def test_cache():
+    """Под pytest тесты тоже работают с кешем в памяти процесса."""
+    with override_settings(CACHES=TEST_CACHES):
+        yield
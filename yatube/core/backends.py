@@ -0,0 +1,72 @@
+"""Бэкенды шаблонов, кеша и миниатюр с замером времени этапов запроса."""
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from sorl.thumbnail.base import ThumbnailBackend
+
+from .cache import SQLiteCache
+from .queries import uncounted
+from .timing import timed
+
+
+class TimedTemplate(Template):
+    # Вложенные {% include %} рендерятся внутри движка и сюда не попадают,
+    # поэтому render - время шаблона верхнего уровня целиком.
+    render = timed('render')(Template.render)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class TimedCacheMixin:
+    """Относит время операций кеша к этапу cache.
+
+    Методы добавляются ниже циклом по CACHE_METHODS.
+    """
+
+
+CACHE_METHODS = (
+    'add', 'get', 'set', 'touch', 'delete', 'get_many', 'set_many',
+    'delete_many', 'get_or_set', 'has_key', 'incr', 'decr', 'clear',
+)
+
+
+def _timed_cache_method(name):
+    def method(self, *args, **kwargs):
+        return getattr(super(TimedCacheMixin, self), name)(*args, **kwargs)
+    method.__name__ = name
+    return timed('cache')(method)
+
+
+for _name in CACHE_METHODS:
+    setattr(TimedCacheMixin, _name, _timed_cache_method(_name))
+
+
+class TimedLocMemCache(TimedCacheMixin, LocMemCache):
+    pass
+
+
+class TimedSQLiteCache(TimedCacheMixin, SQLiteCache):
+    pass
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    """Поиск миниатюры при холодном кеше читает и пишет хранилище sorl.
+
+    Число таких запросов зависит от состояния кеша, а не от view,
+    поэтому они не входят в бюджет запросов (см. core.queries.uncounted).
+    """
+
+    @timed('thumbnail')
+    def get_thumbnail(self, *args, **kwargs):
+        with uncounted():
+            return super().get_thumbnail(*args, **kwargs)
@@ -0,0 +1,244 @@
+"""Кеш в файле SQLite, общий для всех процессов на одном сервере.
+
+Не требует отдельного сервера: каждый процесс открывает файл LOCATION
+сам, WAL позволяет читать параллельно с записью. Размер ограничен
+OPTIONS['MAX_ENTRIES'] и OPTIONS['MAX_SIZE'] (байт), при превышении
+удаляются просроченные и давно не читавшиеся записи. Целые числа
+хранятся как INTEGER, поэтому incr выполняется одним UPDATE без гонок
+между процессами.
+
+Нужен SQLite 3.24+ (INSERT ... ON CONFLICT). RETURNING из 3.35
+используется, если доступен, иначе incr читает значение отдельным
+SELECT в той же транзакции.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL, '
+    'size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    # Число записей и их объём поддерживаются триггерами, чтобы
+    # проверка лимитов не сканировала таблицу.
+    'CREATE TABLE IF NOT EXISTS cache_stats '
+    '(id INTEGER PRIMARY KEY CHECK (id = 1), entries INTEGER, bytes INTEGER)',
+    'INSERT OR IGNORE INTO cache_stats VALUES (1, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_inserted AFTER INSERT ON cache '
+    'BEGIN UPDATE cache_stats SET entries = entries + 1, '
+    'bytes = bytes + NEW.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_deleted AFTER DELETE ON cache '
+    'BEGIN UPDATE cache_stats SET entries = entries - 1, '
+    'bytes = bytes - OLD.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_resized AFTER UPDATE OF size ON cache '
+    'BEGIN UPDATE cache_stats SET bytes = bytes - OLD.size + NEW.size; END',
+)
+UPSERT = (
+    'INSERT INTO cache (key, value, expires, accessed, size) '
+    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, expires = excluded.expires, '
+    'accessed = excluded.accessed, size = excluded.size'
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+# Время последнего чтения обновляется не чаще раза в секунду, чтобы
+# попадания в кеш почти не требовали записи.
+ACCESS_RESOLUTION = 1.0
+SQLITE_MAX_VARIABLES = 900
+UPSERT_VERSION = (3, 24, 0)
+RETURNING_VERSION = (3, 35, 0)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        if sqlite3.sqlite_version_info < UPSERT_VERSION:
+            raise ImproperlyConfigured(
+                f'SQLiteCache требует SQLite 3.24 или новее, '
+                f'установлен {sqlite3.sqlite_version}.')
+        self._returning = sqlite3.sqlite_version_info >= RETURNING_VERSION
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._busy_timeout = int(options.get('BUSY_TIMEOUT', 5000))
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        # Соединение не переживает fork: у дочернего процесса своё.
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout / 1000,
+                isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = OFF')
+            with self._transaction(connection):
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    @contextmanager
+    def _transaction(self, connection=None):
+        connection = connection or self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _encode(self, value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _row(self, key, value, timeout, now):
+        encoded = self._encode(value)
+        size = len(key) + (8 if isinstance(encoded, int) else len(encoded))
+        return key, encoded, self.get_backend_timeout(timeout), now, size
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        key_map = {self._key(key, version): key for key in keys}
+        if not key_map:
+            return {}
+        now = time.time()
+        found = {}
+        stale = []
+        names = list(key_map)
+        for start in range(0, len(names), SQLITE_MAX_VARIABLES):
+            chunk = names[start:start + SQLITE_MAX_VARIABLES]
+            rows = self._connection.execute(
+                'SELECT key, value, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))}) AND {ALIVE}',
+                [*chunk, now],
+            ).fetchall()
+            for name, value, accessed in rows:
+                found[key_map[name]] = self._decode(value)
+                if accessed < now - ACCESS_RESOLUTION:
+                    stale.append((now, name))
+        if stale:
+            with self._transaction() as connection:
+                connection.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?', stale)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = [
+            self._row(self._key(key, version), value, timeout, now)
+            for key, value in data.items()
+        ]
+        with self._transaction() as connection:
+            connection.executemany(UPSERT, rows)
+            self._cull(connection, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        row = self._row(self._key(key, version), value, timeout, now)
+        with self._transaction() as connection:
+            # Существующая живая запись не перезаписывается.
+            cursor = connection.execute(
+                UPSERT + ' WHERE cache.expires IS NOT NULL '
+                'AND cache.expires <= ?', [*row, now])
+            added = cursor.rowcount > 0
+            if added:
+                self._cull(connection, now)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+                [self.get_backend_timeout(timeout),
+                 self._key(key, version), now],
+            )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        name = self._key(key, version)
+        update = (
+            'UPDATE cache SET value = value + ? '
+            f"WHERE key = ? AND {ALIVE} AND typeof(value) = 'integer'"
+        )
+        params = [delta, name, time.time()]
+        with self._transaction() as connection:
+            if self._returning:
+                row = connection.execute(
+                    update + ' RETURNING value', params).fetchone()
+            elif connection.execute(update, params).rowcount:
+                row = connection.execute(
+                    'SELECT value FROM cache WHERE key = ?', [name]
+                ).fetchone()
+            else:
+                row = None
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        return row[0]
+
+    def has_key(self, key, version=None):
+        return self._connection.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            [self._key(key, version), time.time()],
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        names = [self._key(key, version) for key in keys]
+        with self._transaction() as connection:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?', [(name,) for name in names])
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def _cull(self, connection, now):
+        """Вытесняет записи, если превышен лимит числа или объёма."""
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_stats').fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?', [now])
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_stats').fetchone()
+        excess = entries - self._max_entries
+        if size > self._max_size:
+            excess = max(excess, 1)
+        if excess <= 0:
+            return
+        if self._cull_frequency:
+            excess += entries // self._cull_frequency
+        connection.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)', [excess])
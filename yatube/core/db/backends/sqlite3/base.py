@@ -0,0 +1,55 @@
+"""SQLite для нескольких рабочих процессов.
+
+Соединение открывается с WAL (читатели не блокируют писателя),
+synchronous=NORMAL (fsync только при checkpoint), mmap и увеличенным
+кешем страниц. Транзакции начинаются с BEGIN IMMEDIATE: блокировка на
+запись берётся сразу, а не при первом INSERT, поэтому две транзакции
+не упираются друг в друга с мгновенным "database is locked". Если
+блокировку не удалось получить за busy_timeout, BEGIN повторяется с
+экспоненциальной задержкой.
+
+Значения по умолчанию можно переопределить в OPTIONS базы: pragmas,
+write_retries и retry_backoff.
+"""
+import random
+import time
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+WRITE_RETRIES = 5
+RETRY_BACKOFF = 0.05
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.write_retries = kwargs.pop('write_retries', WRITE_RETRIES)
+        self.retry_backoff = kwargs.pop('retry_backoff', RETRY_BACKOFF)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        delay = self.retry_backoff
+        for attempt in range(self.write_retries + 1):
+            try:
+                self.cursor().execute('BEGIN IMMEDIATE')
+                return
+            except OperationalError as exc:
+                if 'locked' not in str(exc) or attempt == self.write_retries:
+                    raise
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
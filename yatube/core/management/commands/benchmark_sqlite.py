@@ -0,0 +1,95 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+ENGINES = (
+    ('stock', 'django.db.backends.sqlite3'),
+    ('tuned', 'core.db.backends.sqlite3'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность стандартного и настроенного '
+        'бэкенда SQLite: несколько потоков одновременно выполняют '
+        'транзакции "прочитать и записать" во временной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Число одновременных потоков.')
+        parser.add_argument('--transactions', type=int, default=200,
+                            help='Транзакций на поток.')
+        parser.add_argument('--reads', type=int, default=5,
+                            help='Чтений вне транзакции на одну запись.')
+
+    def handle(self, *args, **options):
+        rows = []
+        with tempfile.TemporaryDirectory() as directory:
+            for label, engine in ENGINES:
+                path = os.path.join(directory, f'{label}.sqlite3')
+                rows.append((label, *self.run(engine, path, options)))
+        self.stdout.write(
+            f'{"backend":<8}{"tx/s":>10}{"reads/s":>10}{"errors":>8}')
+        for label, writes, reads, errors in rows:
+            self.stdout.write(
+                f'{label:<8}{writes:>10.1f}{reads:>10.1f}{errors:>8}')
+
+    def run(self, engine, path, options):
+        alias = f'benchmark_{os.path.basename(path)}'
+        connections.databases[alias] = {
+            **connections['default'].settings_dict,
+            'ENGINE': engine,
+            'NAME': path,
+            'OPTIONS': {},
+        }
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    'CREATE TABLE bench (id INTEGER PRIMARY KEY, '
+                    'value INTEGER)')
+            connections[alias].close()
+            errors = []
+            threads = [
+                threading.Thread(
+                    target=self.worker, args=(alias, options, errors))
+                for _ in range(options['threads'])
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            del connections.databases[alias]
+        writes = options['threads'] * options['transactions'] - len(errors)
+        reads = writes * options['reads']
+        return writes / elapsed, reads / elapsed, len(errors)
+
+    def worker(self, alias, options, errors):
+        connection = connections[alias]
+        try:
+            for number in range(options['transactions']):
+                try:
+                    with transaction.atomic(using=alias):
+                        with connection.cursor() as cursor:
+                            # Чтение перед записью: со стандартным BEGIN
+                            # такие транзакции конфликтуют при повышении
+                            # блокировки до записи.
+                            cursor.execute('SELECT MAX(value) FROM bench')
+                            cursor.execute(
+                                'INSERT INTO bench (value) VALUES (%s)',
+                                [number])
+                except OperationalError:
+                    errors.append(number)
+                    continue
+                with connection.cursor() as cursor:
+                    for _ in range(options['reads']):
+                        cursor.execute('SELECT COUNT(*) FROM bench')
+        finally:
+            connection.close()
@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик. Заменяет '
+        'репликацию, когда реплики - локальные файлы SQLite.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Команда нужна только для SQLite: реплики других СУБД '
+                'синхронизирует сама СУБД.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены.')
+        # Как и бэкенд Django, имена вида file:... разбираются как URI.
+        source = sqlite3.connect(primary.settings_dict['NAME'], uri=True)
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                connections[alias].close()
+                target = sqlite3.connect(
+                    connections[alias].settings_dict['NAME'], uri=True)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                if options['verbosity']:
+                    self.stdout.write(f'{alias}: синхронизирована')
+        finally:
+            source.close()
@@ -0,0 +1,113 @@
+import logging
+import time
+
+from django.conf import settings
+
+from . import routers, timing
+from .queries import QueryBudgetExceeded, count_queries, view_stats
+
+logger = logging.getLogger('core.queries')
+
+STICKY_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class QueryCountMiddleware:
+    """Считает запросы и время в БД для каждого разрешённого view.
+
+    Если view объявил бюджет через @query_budget и превысил его,
+    превышение учитывается в статистике и пишется предупреждением,
+    а при QUERY_BUDGET_STRICT приводит к ошибке. Запросы хранилища
+    миниатюр в бюджет не входят.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as counter:
+            response = self.get_response(request)
+        request.query_counter = counter
+        match = request.resolver_match
+        if match is None:
+            return response
+        budget = getattr(match.func, 'query_budget', None)
+        over_budget = budget is not None and counter.count > budget
+        view_stats.add(match.view_name, counter, over_budget)
+        logger.debug(
+            '%s: %d queries, %.1f ms',
+            match.view_name, counter.count, counter.duration * 1000,
+        )
+        if over_budget:
+            message = (
+                f'{match.view_name}: {counter.count} SQL-запросов '
+                f'при бюджете {budget}'
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ServerTimingMiddleware:
+    """Добавляет заголовок Server-Timing с разбивкой времени запроса.
+
+    Время в БД берётся у QueryCountMiddleware, поэтому этот middleware
+    должен стоять выше него. Длительности попадают в гистограммы,
+    которые отдаёт core.views.metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        timing.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = timing.finish_request()
+        total = time.perf_counter() - start
+        counter = getattr(request, 'query_counter', None)
+        if counter is not None:
+            timings.durations['db'] = counter.duration
+        entries = [
+            f'{phase};dur={duration * 1000:.2f}'
+            for phase, duration in timings.durations.items()
+        ]
+        if counter is not None:
+            entries[0] += f';desc="{counter.count} queries"'
+        entries.append(f'total;dur={total * 1000:.2f}')
+        response['Server-Timing'] = ', '.join(entries)
+        match = request.resolver_match
+        if match is not None:
+            timing.histograms.observe(
+                match.view_name, total, timings.durations)
+        return response
+
+
+class ReplicaMiddleware:
+    """Разрешает чтение с реплик в безопасных запросах.
+
+    После запроса с записью браузер получает cookie на
+    REPLICA_STICKY_SECONDS, и пока она жива, чтение идёт из основной
+    базы: пользователь сразу видит свой пост, даже если реплика отстаёт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        routers.use_replica(
+            bool(settings.DATABASE_REPLICAS) and safe
+            and STICKY_COOKIE not in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.use_replica(False)
+        if not safe and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True)
+        return response
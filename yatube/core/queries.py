@@ -0,0 +1,96 @@
+"""Учёт SQL-запросов: счётчик, бюджет на view и сводная статистика."""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def uncounted():
+    """Запросы внутри блока не идут в счёт бюджета view.
+
+    Они учитываются отдельно в QueryCounter.excluded, а их время
+    остаётся во времени БД.
+    """
+    _local.depth = getattr(_local, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+
+
+class QueryCounter:
+    """Обёртка для connection.execute_wrapper, считает запросы и время."""
+
+    def __init__(self):
+        self.count = 0
+        self.excluded = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if getattr(_local, 'depth', 0):
+                self.excluded += 1
+            else:
+                self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries():
+    """Считает запросы ко всем базам внутри блока with."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def query_budget(limit):
+    """Объявляет максимальное число запросов для view-функции."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+class ViewQueryStats:
+    """Накопленные по каждому view число запросов и время в БД."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def add(self, view_name, counter, over_budget=False):
+        with self._lock:
+            stats = self._views.setdefault(view_name, {
+                'requests': 0, 'queries': 0, 'max_queries': 0,
+                'db_time': 0.0, 'over_budget': 0,
+            })
+            stats['requests'] += 1
+            stats['over_budget'] += over_budget
+            stats['queries'] += counter.count
+            stats['max_queries'] = max(stats['max_queries'], counter.count)
+            stats['db_time'] += counter.duration
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._views.items()}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+view_stats = ViewQueryStats()
@@ -0,0 +1,73 @@
+"""Маршрутизация чтения на реплики БД.
+
+Чтение уходит на реплику только внутри запросов, которые
+ReplicaMiddleware пометил как безопасные: GET/HEAD без cookie недавней
+записи. Запись, команды управления и фоновые потоки всегда работают с
+основной базой, поэтому видят собственные изменения.
+
+Ленты читаются с реплики, но данные, которые кладутся в кеш под
+текущим поколением (фрагменты, счётчики, курсоры), читаются из основной
+базы: отстающая реплика оставила бы в кеше устаревшее значение до
+следующей инвалидации. По той же причине ответ, прочитанный с реплики,
+отдаётся без ETag.
+"""
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+_local = threading.local()
+
+
+def use_replica(enabled):
+    _local.use_replica = enabled
+
+
+def replica_enabled():
+    return getattr(_local, 'use_replica', False)
+
+
+@contextmanager
+def primary():
+    """Чтение внутри блока идёт из основной базы."""
+    previous = replica_enabled()
+    use_replica(False)
+    try:
+        yield
+    finally:
+        use_replica(previous)
+
+
+def etag_from_primary(view):
+    """Убирает ETag из ответа, прочитанного с реплики.
+
+    Ставится над @condition: иначе браузер получил бы под текущим
+    поколением тело от отстающей реплики и получал бы 304 на него до
+    следующего изменения. Ответ 304 на ETag из основной базы остаётся.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if replica_enabled() and response.status_code == 200:
+            del response['ETag']
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and replica_enabled():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,57 @@
+from urllib.parse import urlsplit
+
+from django.db import connection
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from .queries import count_queries
+
+
+class QueryBudgetMixin:
+    """Проверки бюджета запросов для TestCase.
+
+    Бюджет берётся из декоратора @query_budget у view, которому
+    соответствует URL. Запросы считаются так же, как в
+    QueryCountMiddleware.
+    """
+
+    def assertWithinQueryBudget(self, client, url):
+        view = resolve(urlsplit(url).path).func
+        budget = getattr(view, 'query_budget', None)
+        self.assertIsNotNone(budget, f'У view для {url} не задан бюджет')
+        with CaptureQueriesContext(connection) as context:
+            with count_queries() as counter:
+                response = client.get(url)
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            counter.count, budget,
+            f'{url}: {counter.count} SQL-запросов при бюджете {budget}:\n'
+            f'{queries}'
+        )
+        return response
+
+
+# Кеш в памяти процесса для тестов: manage.py test (TestRunner) и
+# pytest (conftest.py) не трогают cache.sqlite3 рабочего сервера.
+TEST_CACHES = {
+    'default': {'BACKEND': 'core.backends.TimedLocMemCache'},
+}
+
+
+class TestRunner(DiscoverRunner):
+    """Тесты работают с кешем в памяти процесса.
+
+    Файл cache.sqlite3 рабочего сервера не используется и не
+    засоряется; SQLiteCache проверяется отдельно на временных файлах.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_settings = override_settings(CACHES=TEST_CACHES)
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,129 @@
+"""Разбивка времени запроса по этапам и гистограммы по view.
+
+Во время запроса этапы (db, render, cache, thumbnail) копятся в
+объекте RequestTimings текущего потока. ServerTimingMiddleware выводит
+их в заголовок Server-Timing и добавляет в гистограммы, которые
+отдаёт текстовый эндпоинт метрик.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PHASES = ('db', 'render', 'cache', 'thumbnail')
+
+_local = threading.local()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self._depth = dict.fromkeys(PHASES, 0)
+
+    def add(self, phase, duration):
+        self.durations[phase] += duration
+
+
+def start_request():
+    _local.timings = RequestTimings()
+    return _local.timings
+
+
+def finish_request():
+    return _local.__dict__.pop('timings', None)
+
+
+@contextmanager
+def timer(phase):
+    """Добавляет время блока к этапу текущего запроса.
+
+    Вложенные замеры одного этапа (например, cache.get_or_set,
+    вызывающий get и add) учитываются один раз.
+    """
+    timings = getattr(_local, 'timings', None)
+    if timings is None or timings._depth[phase]:
+        yield
+        return
+    timings._depth[phase] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._depth[phase] -= 1
+        timings.add(phase, time.perf_counter() - start)
+
+
+def timed(phase):
+    """Декоратор метода, замеряющий его время как этап phase."""
+    def decorator(method):
+        def wrapper(*args, **kwargs):
+            with timer(phase):
+                return method(*args, **kwargs)
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+    return decorator
+
+
+class Histograms:
+    """Гистограммы длительности запросов и суммы этапов по view."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view_name, total, durations):
+        with self._lock:
+            view = self._views.setdefault(view_name, {
+                'buckets': [0] * len(BUCKETS),
+                'count': 0,
+                'sum': 0.0,
+                'phases': dict.fromkeys(PHASES, 0.0),
+            })
+            for index, bound in enumerate(BUCKETS):
+                if total <= bound:
+                    view['buckets'][index] += 1
+            view['count'] += 1
+            view['sum'] += total
+            for phase, duration in durations.items():
+                view['phases'][phase] += duration
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                '# HELP yatube_request_duration_seconds Время ответа view.',
+                '# TYPE yatube_request_duration_seconds histogram',
+            ]
+            for name, view in views:
+                for bound, total in zip(BUCKETS, view['buckets']):
+                    lines.append(
+                        'yatube_request_duration_seconds_bucket'
+                        f'{{view="{name}",le="{bound}"}} {total}')
+                lines += [
+                    'yatube_request_duration_seconds_bucket'
+                    f'{{view="{name}",le="+Inf"}} {view["count"]}',
+                    'yatube_request_duration_seconds_sum'
+                    f'{{view="{name}"}} {view["sum"]:.6f}',
+                    'yatube_request_duration_seconds_count'
+                    f'{{view="{name}"}} {view["count"]}',
+                ]
+            lines += [
+                '# HELP yatube_request_phase_seconds_total Время этапов '
+                'запроса.',
+                '# TYPE yatube_request_phase_seconds_total counter',
+            ]
+            for name, view in views:
+                for phase, duration in view['phases'].items():
+                    lines.append(
+                        'yatube_request_phase_seconds_total'
+                        f'{{view="{name}",phase="{phase}"}} {duration:.6f}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+histograms = Histograms()
@@ -1,9 +1,23 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Group, Post
 
 
-class PostAdmin(admin.ModelAdmin):
+class FullTextSearchMixin:
+    """Поиск в админке через полнотекстовый индекс вместо icontains."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_available():
+            return super().get_search_results(
+                request, queryset, search_term)
+        ids = search.matching_ids(search_term, self.search_kind)
+        return queryset.filter(pk__in=ids), False
+
+
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = search.POST
     list_display = ('pk', 'text', 'pub_date', 'author', 'group', 'image')
     list_editable = ('group',)
     search_fields = ('text',)
@@ -20,7 +34,8 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = search.COMMENT
     list_display = ('author', 'text', 'created')
     search_fields = ('text',)
     list_filter = ('author',)
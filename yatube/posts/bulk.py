@@ -0,0 +1,55 @@
+"""Массовая вставка записей в обход сигналов и auto_now_add.
+
+Используется импортом и заполнением базы для замеров: производные
+данные (счётчики, ленты, индекс поиска) после неё достраивают команды
+reconcile_counters, rebuild_feeds и rebuild_search_index.
+"""
+from django.db import connection
+from django.db.models import Max
+
+
+def reserve_ids(model, count):
+    """Резервирует count идущих подряд id в таблице SQLite.
+
+    Следующее значение AUTOINCREMENT переносится за выделенный
+    диапазон, поэтому записи, созданные сайтом во время импорта, не
+    займут эти id. Вызывается внутри транзакции: бэкенд начинает её с
+    BEGIN IMMEDIATE, и другие процессы не пишут, пока она не закончится.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+        row = cursor.fetchone()
+        last = max(
+            row[0] if row else 0,
+            model.objects.aggregate(Max('pk'))['pk__max'] or 0,
+        )
+        if row:
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = %s WHERE name = %s',
+                [last + count, table])
+        else:
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                [table, last + count])
+    return range(last + 1, last + count + 1)
+
+
+def create_dated(model, objects, date_field):
+    """bulk_create, сохраняющий даты источника в поле auto_now_add.
+
+    bulk_create подставляет в такое поле текущее время, поэтому даты
+    записываются следующим UPDATE. Объектам проставляются id: их
+    возвращает PostgreSQL, а на SQLite они резервируются заранее.
+    """
+    if not objects:
+        return
+    dates = [getattr(obj, date_field) for obj in objects]
+    if not connection.features.can_return_ids_from_bulk_insert:
+        for obj, pk in zip(objects, reserve_ids(model, len(objects))):
+            obj.pk = pk
+    model.objects.bulk_create(objects)
+    for obj, date in zip(objects, dates):
+        setattr(obj, date_field, date)
+    model.objects.bulk_update(objects, [date_field])
@@ -0,0 +1,111 @@
+"""Поколения (generation) для инвалидации кеша лент.
+
+Каждая область (вся лента, группа, автор, подписки пользователя) имеет
+счётчик в кеше. Сигналы увеличивают счётчик при изменении данных, а
+ключ фрагмента включает текущие значения, поэтому устаревшие фрагменты
+просто перестают запрашиваться и вытесняются по TTL.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = 'generation:{}'
+COUNT_KEY = 'count:{}'
+LATEST_KEY = 'latest:{}'
+
+
+def _initial():
+    # Стартовое значение не повторяет прежних поколений, даже если
+    # счётчик был вытеснен из кеша раньше самих фрагментов.
+    return time.time_ns()
+
+
+def generations(scopes):
+    """Словарь область -> текущее поколение, одним get_many."""
+    keys = {GENERATION_KEY.format(scope): scope for scope in scopes}
+    values = cache.get_many(list(keys))
+    for key in keys:
+        if key not in values:
+            cache.add(key, _initial(), timeout=None)
+            values[key] = cache.get(key)
+    return {scope: values[key] for key, scope in keys.items()}
+
+
+def generation(*scopes):
+    """Возвращает строку с текущими поколениями перечисленных областей."""
+    values = generations(scopes)
+    return '.'.join(str(values[scope]) for scope in scopes)
+
+
+def bump(*scopes):
+    """Делает недействительными фрагменты перечисленных областей."""
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), timeout=None)
+
+
+def after_commit(func, *args):
+    """Вызывает func(*args) после фиксации текущей транзакции.
+
+    Сигналы сбрасывают так кеш (bump, forget_counts, forget_latest):
+    сброс до фиксации позволил бы параллельному запросу снова
+    закешировать данные, ещё не видящие изменений.
+    """
+    transaction.on_commit(lambda: func(*args))
+
+
+def count_key(scope):
+    """Ключ кеша с числом записей ленты для постраничной навигации."""
+    return COUNT_KEY.format(scope)
+
+
+def forget_counts(*scopes):
+    """Сбрасывает кешированное число записей лент областей."""
+    cache.delete_many([count_key(scope) for scope in scopes])
+
+
+def latest_key(scope):
+    """Ключ кеша с курсором самого нового поста ленты."""
+    return LATEST_KEY.format(scope)
+
+
+def forget_latest(*scopes):
+    """Сбрасывает кешированный курсор нового поста лент областей."""
+    cache.delete_many([latest_key(scope) for scope in scopes])
+
+
+def feed_cache(*scopes):
+    """Контекст для {% cache %} ленты с ключом по поколениям."""
+    return {
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'feed_generation': generation(*scopes),
+    }
+
+
+def etag(request, *scopes):
+    """ETag страницы по поколениям областей.
+
+    В значение входят путь с параметрами, пользователь и CSRF-cookie,
+    чтобы ответ 304 не отдал чужую или устаревшую форму.
+    """
+    user = request.user
+    parts = (
+        generation(*scopes),
+        request.get_full_path(),
+        str(user.pk) if user.is_authenticated else '',
+        request.META.get('CSRF_COOKIE', ''),
+    )
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def post_scopes(post):
+    scopes = ['posts', f'post:{post.pk}', f'author:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
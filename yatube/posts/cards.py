@@ -0,0 +1,54 @@
+"""Кеш отрендеренных карточек постов.
+
+Карточка (includes/post_card.html) не зависит от пользователя и ленты,
+поэтому одна копия используется главной, группами, подписками и
+"Популярным". Ключ включает Post.updated и поколения card:author:<id>
+и card:group:<id>, которые сигналы увеличивают при переименовании
+автора и изменении или удалении группы. Правка поста меняет ключ
+только его карточки, а прежняя копия вытесняется по сроку.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core.routers import replica_enabled
+
+from .cache import generations
+
+CARD_KEY = 'card:{}:{}'
+TEMPLATE = 'includes/post_card.html'
+
+
+def card_scopes(post):
+    """Области, от которых зависит карточка помимо самого поста."""
+    scopes = [f'card:author:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'card:group:{post.group_id}')
+    return scopes
+
+
+def card_key(post, versions=None):
+    if versions is None:
+        versions = generations(card_scopes(post))
+    parts = [str(int(post.updated.timestamp() * 10**6))]
+    parts += [str(versions[scope]) for scope in card_scopes(post)]
+    return CARD_KEY.format(post.pk, '.'.join(parts))
+
+
+def render_cards(posts):
+    """HTML карточек: найденные в кеше одним get_many, остальные рендерятся."""
+    versions = generations(
+        {scope for post in posts for scope in card_scopes(post)})
+    keys = [card_key(post, versions) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {
+        key: render_to_string(TEMPLATE, {'post': post})
+        for key, post in zip(keys, posts)
+        if key not in cards
+    }
+    # Автор и группа прочитаны с реплики и могут отставать от
+    # поколений в ключе: такие карточки не сохраняются.
+    if missing and not replica_enabled():
+        cache.set_many(missing, settings.CARD_CACHE_TIMEOUT)
+    cards.update(missing)
+    return [cards[key] for key in keys]
@@ -0,0 +1,100 @@
+"""Денормализованные счётчики постов, комментариев и подписок."""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.routers import primary
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def shift(queryset, field, delta):
+    """Атомарно изменяет счётчик строк queryset на delta.
+
+    Счётчик не уходит ниже нуля: такие расхождения исправляет
+    reconcile_counters.
+    """
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def shift_user(user_id, field, delta):
+    stats = UserStats.objects.filter(user=user_id)
+    changed = shift(stats, field, delta)
+    if not changed and delta > 0:
+        # Строки может не быть у пользователей, созданных до счётчиков
+        # или загрузкой с raw=True.
+        UserStats.objects.get_or_create(user_id=user_id)
+        changed = shift(stats, field, delta)
+    return changed
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def _repair(queryset, **expected):
+    """Обновляет только строки, где счётчик разошёлся с фактом."""
+    repaired = 0
+    for field, actual in expected.items():
+        drifted = queryset.annotate(actual=actual).exclude(
+            **{field: F('actual')})
+        repaired += queryset.filter(pk__in=drifted.values('pk')).update(
+            **{field: actual})
+    return repaired
+
+
+def reconcile_users(user_ids=None):
+    missing = User.objects.filter(stats__isnull=True)
+    if user_ids is not None:
+        missing = missing.filter(pk__in=user_ids)
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in missing.values_list('pk', flat=True)),
+        ignore_conflicts=True,
+    )
+    stats = UserStats.objects.all()
+    if user_ids is not None:
+        stats = stats.filter(user__in=user_ids)
+    return _repair(
+        stats,
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+
+
+def user_stats(user):
+    """Счётчики пользователя для вывода.
+
+    Если строки UserStats нет, она создаётся сразу с точными
+    значениями.
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        pass
+    reconcile_users([user.pk])
+    with primary():
+        user.stats = UserStats.objects.get(user=user.pk)
+    return user.stats
+
+
+def reconcile():
+    """Пересчитывает все счётчики, возвращает число исправленных строк."""
+    return {
+        'users': reconcile_users(),
+        'groups': _repair(
+            Group.objects.all(),
+            posts_count=_count(Post.objects.all(), 'group'),
+        ),
+        'posts': _repair(
+            Post.objects.all(),
+            comments_count=_count(Comment.objects.all(), 'post'),
+        ),
+    }
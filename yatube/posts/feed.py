@@ -0,0 +1,246 @@
+"""Лента подписок с раскладкой постов по "почтовым ящикам" читателей.
+
+Посты обычных авторов копируются в FeedEntry каждого подписчика при
+публикации. Для популярных авторов (подписчиков больше, чем
+FEED_CELEBRITY_FOLLOWERS) раскладка не выполняется: их посты
+подмешиваются в ленту отдельным запросом по автору. Когда автор
+опускается ниже порога, он ставится в очередь FeedFanOut, и его посты
+раскладываются всем подписчикам командой rebuild_feeds --queued.
+Лента листается по индексу FeedEntry (user, pub_date, post), курсор -
+дата и id поста.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from yatube.settings import QUANTITY
+
+from .follows import following_ids, forget
+from .models import FeedEntry, FeedFanOut, Follow, Post, User, UserStats
+from .utils import CursorPage, decode_cursor
+
+BATCH_SIZE = 500
+
+
+def celebrity_ids(author_ids):
+    """Возвращает id авторов, чьи посты не раскладываются по лентам.
+
+    Кроме популярных авторов, сюда входят стоящие в очереди FeedFanOut:
+    их посты ещё не разложены.
+    """
+    return set(
+        UserStats.objects.filter(
+            Q(followers_count__gt=settings.FEED_CELEBRITY_FOLLOWERS)
+            | Q(user__in=FeedFanOut.objects.values('author')),
+            user__in=author_ids,
+        ).values_list('user', flat=True)
+    )
+
+
+def is_celebrity(author_id):
+    return author_id in celebrity_ids([author_id])
+
+
+def _bulk_insert(entries):
+    """Вставляет записи пачками, не собирая генератор целиком в память."""
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author=post.author_id).values_list('user', flat=True)
+    _bulk_insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Переносит посты автора в ленту нового подписчика."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author=author_id).values_list('pk', 'pub_date')
+    _bulk_insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=pk,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def left_celebrities(author_id):
+    """Перестал ли автор быть популярным после отписки от него.
+
+    Счётчик уменьшается на единицу за отписку, поэтому значение,
+    равное порогу, означает, что порог только что пройден вниз.
+    """
+    return UserStats.objects.filter(
+        user=author_id,
+        followers_count=settings.FEED_CELEBRITY_FOLLOWERS,
+    ).exists()
+
+
+def schedule_fan_out(*author_ids):
+    """Ставит авторов в очередь на раскладку постов.
+
+    Удалённые к этому моменту авторы пропускаются.
+    """
+    existing = User.objects.filter(
+        pk__in=author_ids).values_list('pk', flat=True)
+    FeedFanOut.objects.bulk_create(
+        (FeedFanOut(author_id=author_id) for author_id in existing),
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_all(author_id):
+    """Раскладывает все посты автора по лентам всех подписчиков.
+
+    Нужна, когда автор перестал быть популярным: посты, написанные
+    раньше, в ленты не попадали. Уже разложенные записи пропускаются.
+    """
+    posts = list(
+        Post.objects.filter(author=author_id).values_list('pk', 'pub_date'))
+    followers = Follow.objects.filter(
+        author=author_id).values_list('user', flat=True)
+    _bulk_insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=pk,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in followers.iterator()
+        for pk, pub_date in posts
+    )
+
+
+def fan_out_queued(limit=None):
+    """Раскладывает посты авторов из очереди, возвращает их число.
+
+    Строка очереди удаляется в одной транзакции с раскладкой, поэтому
+    посты автора всё время видны в лентах тем или иным путём.
+    """
+    queued = FeedFanOut.objects.order_by(
+        'queued').values_list('author', flat=True)
+    author_ids = list(queued[:limit] if limit else queued)
+    for author_id in author_ids:
+        with transaction.atomic():
+            fan_out_all(author_id)
+            FeedFanOut.objects.filter(author=author_id).delete()
+    return len(author_ids)
+
+
+def drop(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    FeedEntry.objects.filter(user=user_id, author=author_id).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает ленту пользователя с нуля."""
+    FeedEntry.objects.filter(user=user_id).delete()
+    forget(user_id)
+    authors = Follow.objects.filter(
+        user=user_id).values_list('author', flat=True)
+    for author_id in authors:
+        backfill(user_id, author_id)
+
+
+def feed_posts(user):
+    """Посты ленты подписок пользователя для постраничного режима.
+
+    Курсорные страницы отдаёт feed_page.
+    """
+    authors = following_ids(user.pk)
+    if not authors:
+        return Post.objects.none()
+    celebrities = celebrity_ids(authors)
+    if not celebrities:
+        return Post.objects.filter(feed_entries__user=user)
+    return Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=celebrities)
+    )
+
+
+def _feed_keys(user_id, celebrities, cursor, newer, limit):
+    """Пары (pub_date, id поста) ленты за курсором в порядке обхода.
+
+    Записи FeedEntry читаются по индексу feed_user_date_idx, посты
+    популярных авторов - отдельным запросом, затем списки сливаются.
+    """
+    lookup = 'gt' if newer else 'lt'
+    entries = FeedEntry.objects.filter(user=user_id)
+    sources = [(entries, 'post_id')]
+    if celebrities:
+        sources = [
+            (entries.exclude(author__in=celebrities), 'post_id'),
+            (Post.objects.filter(author__in=celebrities), 'pk'),
+        ]
+    keys = []
+    for queryset, key in sources:
+        if cursor is not None:
+            moment, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f'pub_date__{lookup}': moment})
+                | Q(**{'pub_date': moment, f'{key}__{lookup}': pk})
+            )
+        ordering = ('pub_date', key) if newer else ('-pub_date', f'-{key}')
+        keys += queryset.order_by(*ordering).values_list(
+            'pub_date', key)[:limit]
+    keys.sort(reverse=not newer)
+    return keys[:limit]
+
+
+def _page(posts, keys, has_next, has_previous):
+    ids = [pk for _, pk in keys]
+    found = posts.in_bulk(ids)
+    return CursorPage(
+        [found[pk] for pk in ids if pk in found],
+        has_next, has_previous, 'pub_date',
+    )
+
+
+def feed_page(user, posts, after=None, before=None, per_page=QUANTITY):
+    """Курсорная страница ленты подписок, как utils.cursor_page.
+
+    Сначала выбираются id постов страницы, затем сами посты из posts,
+    где задаются select_related и only.
+    """
+    authors = following_ids(user.pk)
+    if not authors:
+        return CursorPage([], False, False, 'pub_date')
+    celebrities = celebrity_ids(authors)
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+    if after_key is not None:
+        keys = _feed_keys(
+            user.pk, celebrities, after_key, False, per_page + 1)
+        return _page(posts, keys[:per_page], len(keys) > per_page, True)
+    if before_key is not None:
+        keys = _feed_keys(
+            user.pk, celebrities, before_key, True, per_page + 1)
+        if len(keys) > per_page:
+            return _page(posts, keys[:per_page][::-1], True, True)
+        # Дошли до начала ленты: отдаём полную первую страницу.
+    keys = _feed_keys(user.pk, celebrities, None, False, per_page + 1)
+    return _page(posts, keys[:per_page], len(keys) > per_page, False)
@@ -0,0 +1,47 @@
+"""Кешированный граф подписок.
+
+Для каждого пользователя в кеше хранится множество id авторов, на
+которых он подписан. Оно загружается одним запросом при первом
+обращении и сбрасывается сигналами после фиксации подписки или
+отписки, поэтому кнопка подписки, лента и пакетные проверки обходятся
+без запросов к Follow. Множество служит только для чтения: подписка и
+отписка пишут в базу, где повторы исключает ограничение unique_follow.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core.routers import primary
+
+from .models import Follow
+
+FOLLOWING_KEY = 'following:{}'
+
+
+def following_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь."""
+    if user_id is None:
+        return frozenset()
+    key = FOLLOWING_KEY.format(user_id)
+    authors = cache.get(key)
+    if authors is None:
+        with primary():
+            authors = frozenset(
+                Follow.objects.filter(
+                    user=user_id).values_list('author', flat=True)
+            )
+        cache.set(key, authors, timeout=settings.FOLLOWING_CACHE_TIMEOUT)
+    return authors
+
+
+def is_following(user_id, author_id):
+    return author_id in following_ids(user_id)
+
+
+def followed_among(user_id, author_ids):
+    """Те из author_ids, на которых подписан пользователь."""
+    return following_ids(user_id).intersection(author_ids)
+
+
+def forget(*user_ids):
+    """Сбрасывает множества: следующее чтение загрузит их из базы."""
+    cache.delete_many([FOLLOWING_KEY.format(user_id) for user_id in user_ids])
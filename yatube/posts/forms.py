@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import ugettext_lazy as _
 
+from posts.images import process_upload
 from posts.models import Comment, Post
 
 
@@ -20,6 +22,12 @@ class PostForm(forms.ModelForm):
             'text': forms.Textarea,
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return process_upload(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
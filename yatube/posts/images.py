@@ -0,0 +1,115 @@
+"""Обработка загружаемых изображений постов.
+
+Оригинал не сохраняется: изображение уменьшается до
+POST_IMAGE_MAX_SIZE по большей стороне, поворачивается по EXIF и
+перекодируется в WebP (или JPEG, если Pillow собран без WebP) без
+метаданных. Результат пишется во временный файл на диске, который
+хранилище затем перемещает в MEDIA_ROOT/posts/.
+"""
+import os
+import tempfile
+import weakref
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps, features
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+if features.check('webp'):
+    OUTPUT_FORMAT, EXTENSION = 'WEBP', 'webp'
+else:
+    OUTPUT_FORMAT, EXTENSION = 'JPEG', 'jpg'
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ProcessedImage(File):
+    """Результат обработки во временном файле.
+
+    Благодаря temporary_file_path хранилище перемещает файл вместо
+    копирования; если он так и не был сохранён, его удаляет finalize.
+    """
+
+    def __init__(self, name, content_type):
+        file = tempfile.NamedTemporaryFile(
+            suffix=f'.{EXTENSION}', dir=settings.FILE_UPLOAD_TEMP_DIR,
+            delete=False)
+        super().__init__(file, name)
+        self.content_type = content_type
+        weakref.finalize(self, _discard, file.name)
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def output_name(name):
+    """Имя файла после перекодирования."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{stem}.{EXTENSION}'
+
+
+def open_image(upload):
+    """Открывает изображение, читая только заголовок.
+
+    Формат и размеры проверяются до декодирования пикселей, поэтому
+    подделки и "бомбы" отклоняются без выделения памяти под растр.
+    """
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Загрузите корректное изображение.', code='invalid_image')
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            'Поддерживаются изображения JPEG, PNG, GIF и WebP.',
+            code='invalid_format')
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение слишком большое: %(width)s×%(height)s.',
+            code='too_large', params={'width': width, 'height': height})
+    return image
+
+
+def flatten(image):
+    """Приводит изображение к режиму, который поддерживает формат."""
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+    if has_alpha and OUTPUT_FORMAT == 'WEBP':
+        return image.convert('RGBA')
+    if has_alpha:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def process_upload(upload):
+    """Возвращает уменьшенную и перекодированную копию загрузки."""
+    image = open_image(upload)
+    limit = settings.POST_IMAGE_MAX_SIZE
+    # JPEG сразу декодируется в уменьшенном масштабе (1/2 - 1/8).
+    image.draft('RGB', (limit, limit))
+    try:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        image = flatten(image)
+    except (OSError, ValueError):
+        raise ValidationError(
+            'Загрузите корректное изображение.', code='invalid_image')
+    output = ProcessedImage(
+        output_name(upload.name), f'image/{OUTPUT_FORMAT.lower()}')
+    # EXIF и прочие метаданные не передаются в save и не сохраняются.
+    image.save(output.file, OUTPUT_FORMAT,
+               quality=settings.POST_IMAGE_QUALITY, optimize=True)
+    output.file.flush()
+    output.seek(0)
+    return output
@@ -0,0 +1,274 @@
+import json
+import os
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from core.queries import count_queries
+from posts.bulk import create_dated
+from posts.feed import feed_posts
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import QUANTITY, encode_cursor
+
+BATCH_SIZE = 1000
+BENCH_USERNAME = 'bench0'
+BENCH_GROUPS = 20
+# Посты датируются случайными моментами за этот срок.
+PUB_DATE_SPREAD = timedelta(days=365)
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'core.backends.TimedLocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+def cursor_query(queryset, depth):
+    """Параметр курсора, ведущий на страницу depth курсорной ленты."""
+    offset = (depth - 1) * QUANTITY
+    if not offset:
+        return ''
+    anchor = queryset.order_by('-pub_date', '-pk')[offset - 1:offset].first()
+    return f'?after={encode_cursor(anchor)}' if anchor else ''
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет отдельную БД тестовыми данными и замеряет время '
+        'ответа лент на разной глубине. Результат - JSON, который можно '
+        'сравнить с сохранённым эталоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000,
+                            help='Число постов (например 10000, 100000, '
+                                 '1000000).')
+        parser.add_argument('--comments', type=int, default=2,
+                            help='Комментариев на пост в среднем.')
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Подписок на пользователя.')
+        parser.add_argument('--depths', default='1,10,100',
+                            help='Номера страниц для замера через запятую.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Повторов каждого замера.')
+        parser.add_argument('--warm', action='store_true',
+                            help='Не очищать кеш перед каждым запросом.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора данных.')
+        parser.add_argument('--output',
+                            help='Файл для результатов (по умолчанию '
+                                 'stdout).')
+        parser.add_argument('--baseline',
+                            help='Эталонный JSON для сравнения.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимое замедление медианы '
+                                 '(0.2 = 20%%).')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Не удалять БД с данными после замера.')
+        parser.add_argument('--in-place', action='store_true',
+                            help='Использовать текущую БД вместо '
+                                 'отдельной.')
+
+    def handle(self, *args, **options):
+        old_name = None
+        if not options['in_place']:
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                settings.BASE_DIR, 'benchmark.sqlite3')
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            # Собственный кеш: cache.clear() между повторами не должен
+            # очищать кеш сайта, а ключи тестовой БД - попадать в него.
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                self.seed(options)
+                report = self.measure(options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(
+                    old_name, verbosity=0, keepdb=options['keepdb'])
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['threshold'])
+
+    def blend(self, model, field, pattern, count):
+        """Создаёт недостающие до count записи bench-объектов.
+
+        Номера в pattern продолжают уже созданные: повторный запуск с
+        --keepdb и большими размерами не повторяет имена.
+        """
+        existing = model.objects.filter(
+            **{f'{field}__startswith': pattern.format('')}).count()
+        if existing < count:
+            mixer.cycle(count - existing).blend(
+                model,
+                **{field: mixer.sequence(
+                    lambda number: pattern.format(existing + number))},
+                **({'first_name': mixer.FAKE, 'last_name': mixer.FAKE}
+                   if model is User else {}),
+            )
+        return list(
+            model.objects.filter(
+                **{f'{field}__startswith': pattern.format('')}
+            ).values_list('pk', flat=True)
+        )
+
+    def seed(self, options):
+        """Дополняет базу до заданных размеров."""
+        missing = options['posts'] - Post.objects.count()
+        if missing <= 0:
+            return
+        random.seed(options['seed'])
+        Faker.seed(options['seed'])
+        fake = Faker('ru_RU')
+        users_count = max(10, options['posts'] // 100)
+        self.log(options, f'Пользователи: {users_count}')
+        known_users = set(User.objects.filter(
+            username__startswith='bench').values_list('pk', flat=True))
+        user_ids = self.blend(User, 'username', 'bench{}', users_count)
+        group_ids = self.blend(
+            Group, 'slug', 'bench-group-{}', BENCH_GROUPS) + [None]
+
+        self.log(options, f'Посты: {missing}')
+        now = timezone.now()
+        for start in range(0, missing, BATCH_SIZE):
+            with transaction.atomic():
+                create_dated(Post, [
+                    Post(
+                        text=fake.text(300),
+                        author_id=random.choice(user_ids),
+                        group_id=random.choice(group_ids),
+                        pub_date=now - PUB_DATE_SPREAD * random.random(),
+                    )
+                    for _ in range(min(BATCH_SIZE, missing - start))
+                ], 'pub_date')
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        comments = missing * options['comments']
+        self.log(options, f'Комментарии: {comments}')
+        for start in range(0, comments, BATCH_SIZE):
+            Comment.objects.bulk_create(
+                Comment(
+                    text=fake.sentence(),
+                    post_id=random.choice(post_ids),
+                    author_id=random.choice(user_ids),
+                )
+                for _ in range(min(BATCH_SIZE, comments - start))
+            )
+        self.log(options, 'Подписки')
+        follows = {
+            (user_id, author_id)
+            for user_id in set(user_ids) - known_users
+            for author_id in random.sample(
+                user_ids, min(options['follows'], len(user_ids)))
+            if author_id != user_id
+        }
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in follows),
+            batch_size=BATCH_SIZE,
+        )
+        # bulk_create не вызывает сигналы: достраиваем производные данные.
+        for command in ('reconcile_counters', 'rebuild_feeds',
+                        'rebuild_search_index'):
+            call_command(command, verbosity=0)
+
+    def scenarios(self, depths):
+        """Пары (название, URL) для замера."""
+        bench_user = User.objects.get(username=BENCH_USERNAME)
+        group = Group.objects.order_by('pk').first()
+        author = User.objects.order_by('-stats__posts_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        for depth in depths:
+            yield f'index@{depth}', reverse('posts:index') + cursor_query(
+                Post.objects.all(), depth)
+            yield f'group_posts@{depth}', reverse(
+                'posts:group_list', kwargs={'slug': group.slug}
+            ) + f'?page={depth}'
+            yield f'profile@{depth}', reverse(
+                'posts:profile', kwargs={'username': author.username}
+            ) + f'?page={depth}'
+            yield f'follow_index@{depth}', reverse(
+                'posts:follow_index'
+            ) + cursor_query(feed_posts(bench_user), depth)
+        yield 'post_detail', reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk})
+
+    def measure(self, options):
+        depths = [int(depth) for depth in options['depths'].split(',')]
+        client = Client()
+        client.force_login(User.objects.get(username=BENCH_USERNAME))
+        results = {}
+        for name, url in self.scenarios(depths):
+            timings = []
+            for _ in range(options['repeat']):
+                if not options['warm']:
+                    cache.clear()
+                with count_queries() as counter:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(
+                        f'{url}: код ответа {response.status_code}')
+            timings.sort()
+            results[name] = {
+                'url': url,
+                'median_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(
+                    timings[int(0.95 * (len(timings) - 1))], 3),
+                'queries': counter.count,
+            }
+            self.log(options, f'{name}: {results[name]["median_ms"]} мс')
+        return {
+            'meta': {
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+                'repeat': options['repeat'],
+                'warm': options['warm'],
+            },
+            'results': results,
+        }
+
+    def compare(self, report, baseline_path, threshold):
+        with open(baseline_path) as file:
+            baseline = json.load(file)['results']
+        regressions = []
+        for name, current in report['results'].items():
+            if name not in baseline:
+                continue
+            limit = baseline[name]['median_ms'] * (1 + threshold)
+            if current['median_ms'] > limit:
+                regressions.append(
+                    f'{name}: {current["median_ms"]} мс, эталон '
+                    f'{baseline[name]["median_ms"]} мс'
+                )
+            if current['queries'] > baseline[name]['queries']:
+                regressions.append(
+                    f'{name}: {current["queries"]} SQL-запросов, эталон '
+                    f'{baseline[name]["queries"]}'
+                )
+        if regressions:
+            raise CommandError(
+                'Замедление относительно эталона:\n' + '\n'.join(regressions))
+        self.stderr.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def log(self, options, message):
+        if options['verbosity'] > 1:
+            self.stderr.write(message)
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import suggestions
+from posts.models import SuggestionRefresh, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации подписок по графу подписок и общим '
+        'группам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи рекомендации нужно пересчитать (по '
+                 'умолчанию все).',
+        )
+        parser.add_argument(
+            '--queued', action='store_true',
+            help='Пересчитать только пользователей из очереди, '
+                 'поставленных туда подписками и отписками.',
+        )
+        parser.add_argument(
+            '--limit', type=int,
+            help='Сколько пользователей из очереди обработать.',
+        )
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            total = suggestions.compute_queued(options['limit'])
+            if options['verbosity']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Пересчитано из очереди: {total}.'))
+            return
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(
+                users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(
+                    f'Пользователи не найдены: {", ".join(sorted(missing))}')
+        else:
+            # Полный пересчёт покрывает всех, кто стоял в очереди.
+            SuggestionRefresh.objects.all().delete()
+        total = users.count()
+        stored = 0
+        verbosity = options['verbosity']
+        for number, user_id in enumerate(
+                users.values_list('pk', flat=True).iterator(), start=1):
+            stored += suggestions.compute(user_id)
+            if verbosity > 1:
+                self.stdout.write(f'{number}/{total}')
+        if verbosity:
+            self.stdout.write(self.style.SUCCESS(
+                f'Пользователей: {total}, рекомендаций: {stored}.'))
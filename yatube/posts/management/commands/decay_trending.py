@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет посты, оценка популярности которых опустилась ниже '
+        'TRENDING_MIN_SCORE. Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **options):
+        removed = trending.decay()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено остывших: {removed}.'))
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _record(post):
+    """Создаёт варианты одного поста, возвращает признак успеха.
+
+    Ошибка (например, отсутствующий или битый файл) пишется в лог, как
+    в thumbnails._run, и не прерывает обработку остальных постов.
+    """
+    try:
+        thumbnails.record(*post)
+    except Exception:
+        thumbnails.logger.exception(
+            'Не удалось создать миниатюры для %s', post[1])
+        return False
+    return True
+
+
+def _record_in_pool(post):
+    try:
+        return _record(post)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт варианты изображений для постов, у которых их ещё нет, '
+        'и записывает их в посты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков (1 - без пула, в текущем потоке).',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать варианты и для постов, где они уже есть.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(image_variants='')
+        posts = list(posts.order_by('pk').values_list('pk', 'image'))
+        total = len(posts)
+        verbosity = options['verbosity']
+        if options['workers'] > 1:
+            executor = ThreadPoolExecutor(max_workers=options['workers'])
+            done = executor.map(_record_in_pool, posts)
+        else:
+            executor = None
+            done = map(_record, posts)
+        failed = 0
+        try:
+            for number, ok in enumerate(done, start=1):
+                failed += not ok
+                if verbosity > 1 or verbosity and number % 100 == 0:
+                    self.stdout.write(f'{number}/{total}')
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        if failed:
+            self.stderr.write(f'Не удалось обработать изображений: {failed}.')
+        if verbosity:
+            self.stdout.write(
+                self.style.SUCCESS(f'Обработано изображений: {total}.'))
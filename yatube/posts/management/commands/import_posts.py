@@ -0,0 +1,285 @@
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import thumbnails
+from posts.bulk import create_dated
+from posts.cache import bump, forget_counts, forget_latest
+from posts.models import Comment, Follow, Group, Post, User
+
+KINDS = ('post', 'comment', 'follow')
+
+
+def read_records(path, file_format):
+    """Записи источника по одной, без чтения файла целиком."""
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            for row in csv.DictReader(file):
+                yield {key: value for key, value in row.items() if value}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f'некорректная дата {value!r}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты, комментарии и подписки из JSONL или CSV. '
+        'Каждая запись содержит поле type (post, comment или follow). '
+        'Пост: id, text, author, group, pub_date, image; комментарий: '
+        'post (id поста из источника), author, text, created; подписка: '
+        'user, author. Записи загружаются пачками через bulk_create, '
+        'после сбоя импорт продолжается с последней сохранённой пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с записями.')
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            help='Формат файла (по умолчанию по '
+                                 'расширению).')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Записей в одной транзакции.')
+        parser.add_argument('--images-dir',
+                            help='Каталог, относительно которого заданы '
+                                 'пути изображений.')
+        parser.add_argument('--image-workers', type=int, default=8,
+                            help='Потоков для копирования изображений.')
+        parser.add_argument('--progress',
+                            help='Журнал прогресса (по умолчанию '
+                                 '<path>.progress).')
+        parser.add_argument('--restart', action='store_true',
+                            help='Начать заново, игнорируя журнал.')
+        parser.add_argument('--create-users', action='store_true',
+                            help='Создавать отсутствующих пользователей и '
+                                 'группы.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        self.progress_path = options['progress'] or f'{path}.progress'
+        if options['restart'] and os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+        done, self.post_ids = self.load_progress()
+        self.options = options
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.touched = set()
+        self.skipped = 0
+        self.dropped_thumbnails = 0
+        records = islice(read_records(path, file_format), done, None)
+        with ThreadPoolExecutor(
+                max_workers=options['image_workers']) as self.executor:
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    mapping = self.import_batch(batch)
+                done += len(batch)
+                self.save_progress(done, mapping)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Загружено записей: {done}')
+        self.finish()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Импорт завершён: {done} записей, пропущено '
+                f'{self.skipped}.'))
+        if options['verbosity'] and self.dropped_thumbnails:
+            self.stdout.write(
+                f'Очередь миниатюр переполнена, не поставлено '
+                f'{self.dropped_thumbnails}: запустите generate_thumbnails.')
+
+    def load_progress(self):
+        """Число загруженных записей и соответствие id постов.
+
+        Журнал дописывается строкой после каждой закоммиченной пачки.
+        Пачка, сохранённая в БД, но не попавшая в журнал из-за сбоя
+        между коммитом и записью, будет загружена повторно.
+        """
+        done, post_ids = 0, {}
+        if not os.path.exists(self.progress_path):
+            return done, post_ids
+        with open(self.progress_path) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Оборванная последняя строка: пачка не подтверждена.
+                    break
+                done = entry['done']
+                post_ids.update(entry['posts'])
+        return done, post_ids
+
+    def save_progress(self, done, mapping):
+        with open(self.progress_path, 'a') as file:
+            file.write(json.dumps({'done': done, 'posts': mapping}) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def warn(self, record, reason):
+        self.skipped += 1
+        if self.options['verbosity']:
+            self.stderr.write(f'Пропущена запись {record}: {reason}')
+
+    def user_id(self, username):
+        if not username:
+            return None
+        if username not in self.users and self.options['create_users']:
+            user = User.objects.create_user(username=username)
+            self.users[username] = user.pk
+        return self.users.get(username)
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups and self.options['create_users']:
+            group = Group.objects.create(title=slug, slug=slug)
+            self.groups[slug] = group.pk
+        if slug not in self.groups:
+            raise KeyError(f'группа {slug} не найдена')
+        return self.groups[slug]
+
+    def copy_image(self, name):
+        """Копирует изображение в MEDIA_ROOT/posts/ и возвращает имя."""
+        if not name:
+            return ''
+        source = os.path.join(self.options['images_dir'] or '', name)
+        try:
+            with open(source, 'rb') as file:
+                return default_storage.save(
+                    os.path.join('posts', os.path.basename(name)), File(file))
+        except OSError as exc:
+            self.stderr.write(f'Изображение {source} не скопировано: {exc}')
+            return ''
+
+    def copy_images(self, images):
+        """Копирует изображения постов пачки и ставит их миниатюры.
+
+        Вызывается после коммита пачки, поэтому откат не оставляет в
+        MEDIA_ROOT файлов без постов.
+        """
+        names = self.executor.map(self.copy_image, images.values())
+        posts = [
+            Post(pk=pk, image=name)
+            for pk, name in zip(images, names) if name
+        ]
+        Post.objects.bulk_update(posts, ['image'])
+        for post in posts:
+            if not thumbnails.schedule(post.pk, post.image.name):
+                self.dropped_thumbnails += 1
+
+    def import_batch(self, batch):
+        by_kind = {kind: [] for kind in KINDS}
+        for record in batch:
+            if record.get('type') not in by_kind:
+                self.warn(record, 'неизвестный type')
+                continue
+            by_kind[record['type']].append(record)
+        mapping = self.import_posts(by_kind['post'])
+        self.import_comments(by_kind['comment'])
+        self.import_follows(by_kind['follow'])
+        return mapping
+
+    def import_posts(self, records):
+        rows = []
+        for record in records:
+            try:
+                author_id = self.user_id(record['author'])
+                if author_id is None:
+                    raise KeyError(f'автор {record["author"]} не найден')
+                rows.append((record, Post(
+                    text=record['text'],
+                    author_id=author_id,
+                    group_id=self.group_id(record.get('group')),
+                    pub_date=parse_date(record.get('pub_date')),
+                )))
+            except (KeyError, ValueError) as exc:
+                self.warn(record, exc)
+        # Комментариям нужны id постов этого импорта.
+        create_dated(Post, [post for _, post in rows], 'pub_date')
+        mapping = {}
+        images = {}
+        for record, post in rows:
+            if record.get('id') is not None:
+                mapping[str(record['id'])] = post.pk
+            if record.get('image'):
+                images[post.pk] = record['image']
+            self.touched.update(
+                [f'author:{post.author_id}', f'group:{post.group_id}'])
+        if images:
+            transaction.on_commit(lambda: self.copy_images(images))
+        self.post_ids.update(mapping)
+        return mapping
+
+    def import_comments(self, records):
+        comments = []
+        for record in records:
+            post_id = self.post_ids.get(str(record.get('post')))
+            author_id = self.user_id(record.get('author'))
+            if post_id is None or author_id is None:
+                self.warn(record, 'пост или автор не найден')
+                continue
+            try:
+                created = parse_date(record.get('created'))
+            except ValueError as exc:
+                self.warn(record, exc)
+                continue
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=author_id,
+                text=record.get('text', ''),
+                created=created,
+            ))
+            self.touched.add(f'post:{post_id}')
+        create_dated(Comment, comments, 'created')
+
+    def import_follows(self, records):
+        pairs = set()
+        for record in records:
+            user_id = self.user_id(record.get('user'))
+            author_id = self.user_id(record.get('author'))
+            if user_id is None or author_id is None or user_id == author_id:
+                self.warn(record, 'некорректная подписка')
+                continue
+            pairs.add((user_id, author_id))
+        existing = set(Follow.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs}
+        ).values_list('user_id', 'author_id'))
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs - existing
+        )
+        self.touched.update(f'follow:{user_id}' for user_id, _ in pairs)
+
+    def finish(self):
+        """Достраивает то, что bulk_create не делает через сигналы."""
+        for command in ('reconcile_counters', 'rebuild_feeds',
+                        'rebuild_search_index', 'compute_suggestions'):
+            call_command(command, verbosity=0)
+        bump('posts', *self.touched)
+        forget_counts('posts', *self.touched)
+        forget_latest('posts', *self.touched)
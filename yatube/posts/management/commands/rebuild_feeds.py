@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import feed
+from posts.models import FeedFanOut, User
+
+
+class Command(BaseCommand):
+    help = 'Заполняет и пересобирает ленты подписок пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты нужно пересобрать (по умолчанию '
+                 'все).',
+        )
+        parser.add_argument(
+            '--queued', action='store_true',
+            help='Только разложить посты авторов из очереди, '
+                 'поставленных туда отписками.',
+        )
+        parser.add_argument(
+            '--limit', type=int,
+            help='Сколько авторов из очереди обработать.',
+        )
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            total = feed.fan_out_queued(options['limit'])
+            if options['verbosity']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Разложено постов авторов из очереди: {total}.'))
+            return
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(
+                users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(
+                    f'Пользователи не найдены: {", ".join(sorted(missing))}')
+        else:
+            # Полная пересборка раскладывает посты и авторов из очереди.
+            FeedFanOut.objects.all().delete()
+        total = users.count()
+        verbosity = options['verbosity']
+        for number, user_id in enumerate(
+                users.values_list('pk', flat=True).iterator(), start=1):
+            with transaction.atomic():
+                feed.rebuild(user_id)
+            if verbosity > 1:
+                self.stdout.write(f'{number}/{total}')
+        if verbosity:
+            self.stdout.write(
+                self.style.SUCCESS(f'Пересобрано лент: {total}.'))
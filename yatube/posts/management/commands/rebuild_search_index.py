@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересоздаёт полнотекстовый индекс постов и комментариев.'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Полнотекстовый индекс доступен только '
+                               'для SQLite.')
+        with transaction.atomic():
+            search.rebuild()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS('Индекс пересоздан.'))
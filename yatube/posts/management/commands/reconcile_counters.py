@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = counters.reconcile()
+        if options['verbosity']:
+            for name, total in repaired.items():
+                self.stdout.write(f'{name}: исправлено {total}')
+            self.stdout.write(self.style.SUCCESS('Счётчики сверены.'))
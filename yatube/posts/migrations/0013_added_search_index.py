@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE posts_search USING fts5('
+        'text, post_id UNINDEXED, author_id UNINDEXED, group_id UNINDEXED, '
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text, post_id, author_id, group_id) '
+        'SELECT 2 * id, text, id, author_id, group_id FROM posts_post'
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text, post_id, author_id, group_id) '
+        'SELECT 2 * c.id + 1, c.text, p.id, p.author_id, p.group_id '
+        'FROM posts_comment c JOIN posts_post p ON p.id = c.post_id'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_added_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_added_FollowSuggestion_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('score', models.FloatField(default=0, verbose_name='Оценка')),
+                ('updated', models.DateTimeField(verbose_name='Время расчёта оценки')),
+            ],
+            options={
+                'verbose_name': 'Популярность поста',
+                'verbose_name_plural': 'Популярность постов',
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['-score'], name='trending_score_idx'),
+        ),
+    ]
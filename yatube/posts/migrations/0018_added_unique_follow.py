@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def remove_duplicates(apps, schema_editor):
+    """Оставляет самую раннюю из повторных подписок и пересчитывает
+    счётчики подписок, учитывавшие каждую копию."""
+    UserStats = apps.get_model('posts', 'UserStats')
+    Follow = apps.get_model('posts', 'Follow')
+    keep = (
+        Follow.objects.order_by()
+        .values('user', 'author')
+        .annotate(first=Min('pk'))
+        .values('first')
+    )
+    removed, _ = Follow.objects.exclude(pk__in=keep).delete()
+    if removed:
+        UserStats.objects.update(
+            followers_count=_count(Follow, 'author'),
+            following_count=_count(Follow, 'user'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_added_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
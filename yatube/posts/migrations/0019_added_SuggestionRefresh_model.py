@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0018_added_unique_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestionRefresh',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('queued', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Поставлен в очередь')),
+            ],
+            options={
+                'verbose_name': 'Пересчёт рекомендаций',
+                'verbose_name_plural': 'Пересчёты рекомендаций',
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:40
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def scores_to_ranks(apps, schema_editor):
+    """Переводит оценку на момент updated в ранг log2(оценка) + периоды."""
+    TrendingScore = apps.get_model('posts', 'TrendingScore')
+    period = settings.TRENDING_HALF_LIFE_HOURS * 3600
+    rows = list(TrendingScore.objects.order_by('pk'))
+    for row in rows:
+        row.rank = (
+            math.log2(max(row.rank, settings.TRENDING_MIN_SCORE / 2))
+            + row.updated.timestamp() / period
+        )
+    TrendingScore.objects.bulk_update(rows, ['rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_added_SuggestionRefresh_model'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trendingscore',
+            name='trending_score_idx',
+        ),
+        migrations.RenameField(
+            model_name='trendingscore',
+            old_name='score',
+            new_name='rank',
+        ),
+        migrations.RunPython(scores_to_ranks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='trendingscore',
+            name='updated',
+        ),
+        migrations.AlterField(
+            model_name='trendingscore',
+            name='rank',
+            field=models.FloatField(verbose_name='Ранг'),
+        ),
+        migrations.AlterModelOptions(
+            name='trendingscore',
+            options={'ordering': ['-rank'], 'verbose_name': 'Популярность поста', 'verbose_name_plural': 'Популярность постов'},
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['-rank'], name='trending_rank_idx'),
+        ),
+    ]
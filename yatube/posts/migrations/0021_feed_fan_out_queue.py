@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0020_trending_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedFanOut',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('queued', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Поставлен в очередь')),
+            ],
+            options={
+                'verbose_name': 'Раскладка постов автора',
+                'verbose_name_plural': 'Раскладки постов авторов',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='feedentry',
+            name='feed_user_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='feed_user_date_idx'),
+        ),
+    ]
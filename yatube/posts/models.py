@@ -1,3 +1,5 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
@@ -5,7 +7,27 @@ LENGHT = 15
 User = get_user_model()
 
 
-class Group(models.Model):
+class ManagedFieldsMixin:
+    """Не записывает служебные поля при полном сохранении строки.
+
+    Счётчики (posts.counters) и варианты изображений (posts.thumbnails)
+    меняются только отдельными UPDATE. Полный save() формы или админки
+    записал бы значение, прочитанное при загрузке объекта, и затёр бы
+    сделанные с тех пор изменения.
+    """
+    managed_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.managed_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(ManagedFieldsMixin, models.Model):
     title = models.CharField(
         max_length=200,
         verbose_name='Название группы'
@@ -19,6 +41,13 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name='Описание тематики группы'
     )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество постов'
+    )
+
+    managed_fields = ('posts_count',)
 
     class Meta:
         ordering = ['title']
@@ -29,7 +58,7 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class Post(ManagedFieldsMixin, models.Model):
     text = models.TextField(
         verbose_name='Содержание публикации',
         help_text='Введите текст поста'
@@ -60,6 +89,23 @@ class Post(models.Model):
         blank=True,
         help_text='Загрузите картинку'
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Варианты изображения',
+        help_text='JSON: формат -> список пар (ширина, файл)'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
+    managed_fields = ('comments_count', 'image_variants')
 
     class Meta:
         ordering = ['-pub_date']
@@ -69,6 +115,12 @@ class Post(models.Model):
     def __str__(self) -> str:
         return self.text[:LENGHT]
 
+    def get_image_variants(self):
+        """Готовые варианты изображения: {формат: [(ширина, файл)]}."""
+        if not self.image_variants:
+            return {}
+        return json.loads(self.image_variants)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -102,6 +154,12 @@ class Comment(models.Model):
         ordering = ['-created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -118,5 +176,232 @@ class Follow(models.Model):
         verbose_name='Автор классных постов'
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
     def __str__(self) -> str:
         return f'{self.user.username}, {self.author.username}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, поддерживаемые сигналами.
+
+    Заменяют COUNT-запросы при выводе профиля и поста; расхождения
+    исправляет команда reconcile_counters.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписок'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self) -> str:
+        return str(self.user_id)
+
+
+class FeedEntry(models.Model):
+    """Запись в ленте подписок пользователя.
+
+    Заполняется при публикации поста (fan-out on write), чтобы лента
+    читалась по индексу (user, pub_date) без соединения с Follow.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='feed_user_author_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user_id}, {self.post_id}'
+
+
+class FeedFanOut(models.Model):
+    """Автор, чьи посты нужно разложить по лентам всех подписчиков.
+
+    Ставится в очередь, когда автор перестаёт быть популярным; пока
+    строка есть, его посты читаются прежним запросом по Follow.
+    Очередь разбирает rebuild_feeds --queued.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    queued = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Поставлен в очередь'
+    )
+
+    class Meta:
+        verbose_name = 'Раскладка постов автора'
+        verbose_name_plural = 'Раскладки постов авторов'
+
+    def __str__(self) -> str:
+        return str(self.author_id)
+
+
+class FollowSuggestion(models.Model):
+    """Автор, на которого пользователю предлагается подписаться.
+
+    Заполняется командой compute_suggestions и сигналами подписок;
+    страницы читают первые строки по индексу (user, -score).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggestions',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Предлагаемый автор'
+    )
+    score = models.FloatField(
+        verbose_name='Оценка'
+    )
+    co_follows = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Общих подписчиков у авторов'
+    )
+    shared_groups = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Общих групп'
+    )
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow_suggestion'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'], name='suggestion_user_score_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user_id}, {self.author_id}'
+
+
+class SuggestionRefresh(models.Model):
+    """Пользователь, рекомендации которого нужно пересчитать.
+
+    Подписки и отписки только добавляют строку, пересчёт выполняет
+    compute_suggestions --queued.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пользователь'
+    )
+    queued = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Поставлен в очередь'
+    )
+
+    class Meta:
+        verbose_name = 'Пересчёт рекомендаций'
+        verbose_name_plural = 'Пересчёты рекомендаций'
+
+    def __str__(self) -> str:
+        return str(self.user_id)
+
+
+class TrendingScore(models.Model):
+    """Оценка популярности поста для ленты "Популярное".
+
+    Увеличивается сигналами при публикации поста и новых комментариях
+    и затухает со временем. Хранится не сама оценка, а не зависящий от
+    времени ранг (см. posts.trending), поэтому страница читает строки
+    по индексу rank без пересчёта.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост'
+    )
+    rank = models.FloatField(
+        verbose_name='Ранг'
+    )
+
+    class Meta:
+        ordering = ['-rank']
+        verbose_name = 'Популярность поста'
+        verbose_name_plural = 'Популярность постов'
+        indexes = [
+            models.Index(fields=['-rank'], name='trending_rank_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.post_id}: {self.rank:.2f}'
@@ -0,0 +1,196 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+На SQLite используется виртуальная таблица FTS5 posts_search, которую
+создаёт миграция и синхронизируют сигналы. Каждая строка индекса -
+текст поста или комментария с id поста, его автора и группы, поэтому
+фильтры по группе и автору не требуют соединений. На других СУБД поиск
+выполняется через icontains.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .utils import QUANTITY, cursor_page
+
+TABLE = 'posts_search'
+# rowid строки индекса: 2 * id для поста и 2 * id + 1 для комментария,
+# чтобы обновлять и удалять строки по первичному ключу FTS-таблицы.
+POST = 0
+COMMENT = 1
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def _match_expression(query):
+    """Превращает пользовательский ввод в безопасное выражение MATCH."""
+    words = query.split()
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def _write(rowid, text, post):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id, author_id, group_id) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            [rowid, text, post.pk, post.author_id, post.group_id],
+        )
+
+
+def _delete(rowid):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+
+
+def index_post(post, group_changed=False):
+    if not is_available():
+        return
+    _write(2 * post.pk + POST, post.text, post)
+    if group_changed:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {TABLE} SET group_id = %s WHERE post_id = %s',
+                [post.group_id, post.pk],
+            )
+
+
+def unindex_post(post_id):
+    # Строки комментариев удаляются сигналами каскадного удаления.
+    if is_available():
+        _delete(2 * post_id + POST)
+
+
+def index_comment(comment):
+    if is_available() and comment.post_id:
+        _write(2 * comment.pk + COMMENT, comment.text, comment.post)
+
+
+def unindex_comment(comment_id):
+    if is_available():
+        _delete(2 * comment_id + COMMENT)
+
+
+def rebuild():
+    """Пересоздаёт индекс по текущим постам и комментариям."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id, author_id, group_id) '
+            'SELECT 2 * id, text, id, author_id, group_id FROM posts_post'
+        )
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id, author_id, group_id) '
+            'SELECT 2 * c.id + 1, c.text, p.id, p.author_id, p.group_id '
+            'FROM posts_comment c JOIN posts_post p ON p.id = c.post_id'
+        )
+
+
+def matching_ids(query, kind):
+    """Подзапрос id постов (POST) или комментариев (COMMENT), подходящих
+    под запрос, для фильтра pk__in.
+    """
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    return RawSQL(
+        f'SELECT rowid / 2 FROM {TABLE} '
+        f'WHERE {TABLE} MATCH %s AND rowid %% 2 = %s',
+        [f'text: ({expression})', kind],
+    )
+
+
+def encode_cursor(score, post_id):
+    return f'{score!r}_{post_id}'
+
+
+def decode_cursor(value):
+    try:
+        score, post_id = value.split('_')
+        return float(score), int(post_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+class SearchPage:
+    """Страница результатов поиска в порядке релевантности."""
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def search(query, group_id=None, author_id=None, after=None,
+           per_page=QUANTITY):
+    """Посты, в тексте которых или в комментариях к которым есть слова
+    запроса. Лучшие совпадения (rank FTS5, bm25) идут первыми.
+    """
+    expression = _match_expression(query)
+    if not expression:
+        return SearchPage([], None)
+    if not is_available():
+        return _search_fallback(query, group_id, author_id, after, per_page)
+    conditions = [f'{TABLE} MATCH %s']
+    params = [f'text: ({expression})']
+    if group_id is not None:
+        conditions.append('group_id = %s')
+        params.append(group_id)
+    if author_id is not None:
+        conditions.append('author_id = %s')
+        params.append(author_id)
+    having = ''
+    cursor_key = decode_cursor(after)
+    if cursor_key is not None:
+        having = 'HAVING score > %s OR (score = %s AND post_id > %s)'
+        params += [cursor_key[0], cursor_key[0], cursor_key[1]]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT post_id, MIN(rank) AS score FROM ('
+            f'SELECT post_id, rank FROM {TABLE} '
+            f'WHERE {" AND ".join(conditions)}) '
+            f'GROUP BY post_id {having} '
+            'ORDER BY score, post_id LIMIT %s',
+            params + [per_page + 1],
+        )
+        rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [post_id for post_id, _ in rows])
+    return SearchPage(
+        [posts[post_id] for post_id, _ in rows if post_id in posts],
+        next_cursor,
+    )
+
+
+def _search_fallback(query, group_id, author_id, after, per_page):
+    condition = Q()
+    for word in query.split():
+        condition &= Q(text__icontains=word) | Q(
+            comments__text__icontains=word)
+    posts = Post.objects.select_related('author', 'group').filter(condition)
+    if group_id is not None:
+        posts = posts.filter(group=group_id)
+    if author_id is not None:
+        posts = posts.filter(author=author_id)
+    page = cursor_page(posts.distinct(), after=after, per_page=per_page)
+    return SearchPage(page.object_list, page.next_cursor)
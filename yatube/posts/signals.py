@@ -0,0 +1,187 @@
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    counters, feed, follows, search, suggestions, thumbnails, trending,
+)
+from .cache import (
+    after_commit, bump, forget_counts, forget_latest, post_scopes,
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+# Поля пользователя, которые выводятся в карточках постов и профиле.
+USER_CARD_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    # Вход пользователя сохраняет только last_login: карточки не меняются.
+    if created or raw or (
+            update_fields is not None
+            and not USER_CARD_FIELDS.intersection(update_fields)):
+        return
+    # ETag главной и групп не включает областей карточек: их сбрасывают
+    # вместе с лентами, где есть посты пользователя.
+    group_ids = set(
+        Post.objects.filter(author=instance.pk).order_by()
+        .values_list('group', flat=True).distinct()
+    )
+    feeds = ['posts'] if group_ids else []
+    feeds += [f'group:{group_id}' for group_id in group_ids if group_id]
+    after_commit(bump, f'author:{instance.pk}', f'card:author:{instance.pk}',
+                 *feeds)
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_previous(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_image = None
+    if instance.pk:
+        previous = Post.objects.filter(
+            pk=instance.pk).values_list('group', 'image').first()
+        if previous:
+            (instance._previous_group_id,
+             instance._previous_image) = previous
+    if instance.image.name != instance._previous_image:
+        instance.image_variants = ''
+
+
+@receiver(post_save, sender=Post)
+def post_published(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    group_changed = previous_group_id != instance.group_id
+    with transaction.atomic():
+        if created:
+            counters.shift_user(instance.author_id, 'posts_count', 1)
+        if group_changed:
+            if previous_group_id:
+                counters.shift(Group.objects.filter(
+                    pk=previous_group_id), 'posts_count', -1)
+            if instance.group_id:
+                counters.shift(Group.objects.filter(
+                    pk=instance.group_id), 'posts_count', 1)
+    if created:
+        feed.fan_out(instance)
+        trending.post_published(instance)
+    search.index_post(instance, group_changed=group_changed and not created)
+    image_name = instance.image.name
+    image_changed = image_name != getattr(instance, '_previous_image', None)
+    if image_changed and not created:
+        # Полное сохранение не пишет image_variants: варианты прежней
+        # картинки сбрасываются отдельно.
+        Post.objects.filter(pk=instance.pk).update(image_variants='')
+    if image_name and image_changed:
+        transaction.on_commit(
+            lambda: thumbnails.schedule(instance.pk, image_name))
+    after_commit(bump, *post_scopes(instance))
+    if created or group_changed:
+        after_commit(forget_counts, *post_scopes(instance))
+        after_commit(forget_latest, *post_scopes(instance))
+    if previous_group_id and group_changed:
+        after_commit(bump, f'group:{previous_group_id}')
+        after_commit(forget_counts, f'group:{previous_group_id}')
+        after_commit(forget_latest, f'group:{previous_group_id}')
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    with transaction.atomic():
+        counters.shift_user(instance.author_id, 'posts_count', -1)
+        if instance.group_id:
+            counters.shift(Group.objects.filter(
+                pk=instance.group_id), 'posts_count', -1)
+    search.unindex_post(instance.pk)
+    after_commit(bump, *post_scopes(instance))
+    after_commit(forget_counts, *post_scopes(instance), trending.SCOPE)
+    after_commit(forget_latest, *post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, created=False, **kwargs):
+    if not instance.post_id:
+        return
+    deleted = kwargs['signal'] is post_delete
+    if created or deleted:
+        counters.shift(
+            Post.objects.filter(pk=instance.post_id),
+            'comments_count',
+            1 if created else -1,
+        )
+    if created:
+        trending.comment_added(instance)
+    if deleted:
+        search.unindex_comment(instance.pk)
+    else:
+        search.index_comment(instance)
+    # Комментарии не выводятся в карточках лент, поэтому достаточно
+    # сбросить только поколение самого поста.
+    after_commit(bump, f'post:{instance.post_id}')
+
+
+def group_author_scopes(group_id):
+    return [
+        f'author:{author_id}'
+        for author_id in Post.objects.filter(group=group_id)
+        .order_by().values_list('author', flat=True).distinct()
+    ]
+
+
+@receiver(pre_delete, sender=Group)
+def group_remember_authors(sender, instance, **kwargs):
+    # После удаления у постов уже нет группы.
+    instance._author_scopes = group_author_scopes(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, created=False, **kwargs):
+    # Профили авторов кешируются фрагментом со ссылками на группы.
+    authors = getattr(instance, '_author_scopes', None)
+    if authors is None:
+        authors = [] if created else group_author_scopes(instance.pk)
+    after_commit(bump, 'posts', f'group:{instance.pk}',
+                 f'card:group:{instance.pk}', *authors)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        with transaction.atomic():
+            counters.shift_user(instance.author_id, 'followers_count', 1)
+            counters.shift_user(instance.user_id, 'following_count', 1)
+        feed.backfill(instance.user_id, instance.author_id)
+        after_commit(follows.forget, instance.user_id)
+        suggestions.discard(instance.user_id, instance.author_id)
+        suggestions.schedule(instance.user_id)
+    after_commit(bump, f'follow:{instance.user_id}',
+                 f'stats:{instance.user_id}', f'stats:{instance.author_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    with transaction.atomic():
+        counters.shift_user(instance.author_id, 'followers_count', -1)
+        counters.shift_user(instance.user_id, 'following_count', -1)
+    feed.drop(instance.user_id, instance.author_id)
+    if feed.left_celebrities(instance.author_id):
+        # Раскладка всех постов автора долгая и выполняется командой
+        # rebuild_feeds --queued, а не в запросе отписки.
+        after_commit(feed.schedule_fan_out, instance.author_id)
+    after_commit(follows.forget, instance.user_id)
+    # Подписки удаляются и каскадом вместе с подписчиком: ставить его
+    # в очередь можно только после фиксации, когда видно, что он есть.
+    after_commit(suggestions.schedule, instance.user_id)
+    after_commit(bump, f'follow:{instance.user_id}',
+                 f'stats:{instance.user_id}', f'stats:{instance.author_id}')
@@ -0,0 +1,136 @@
+"""Рекомендации подписок по графу подписок и общим группам.
+
+Оценка автора складывается из двух частей. Первая - сколько "соседей"
+пользователя (подписанных на тех же авторов) подписаны и на него.
+Вторая - в скольких группах он публикуется из тех, где пишет сам
+пользователь или его авторы. Самосоединения Follow для всех
+пользователей выполняет команда compute_suggestions. Подписка сразу
+убирает автора из рекомендаций и, как и отписка, ставит пользователя
+в очередь SuggestionRefresh, которую разбирает compute_suggestions
+--queued. Хранятся первые SUGGESTIONS_PER_USER авторов.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .cache import after_commit, bump
+from .models import (
+    Follow, FollowSuggestion, Post, SuggestionRefresh, User,
+)
+
+CO_FOLLOW_WEIGHT = 1.0
+SHARED_GROUP_WEIGHT = 2.0
+
+
+def co_follow_counts(user_id, followed):
+    """Число соседей пользователя, подписанных на каждого автора."""
+    if not followed:
+        return Counter()
+    peers = Follow.objects.filter(
+        author__in=followed).exclude(user=user_id).values('user')
+    return Counter(dict(
+        Follow.objects.filter(user__in=peers)
+        .exclude(author__in=followed)
+        .exclude(author=user_id)
+        .order_by()
+        .values_list('author')
+        .annotate(Count('user', distinct=True))
+    ))
+
+
+def shared_group_counts(user_id, followed):
+    """Число общих с пользователем групп у каждого автора."""
+    groups = Post.objects.filter(
+        Q(author=user_id) | Q(author__in=followed),
+        group__isnull=False,
+    ).values('group')
+    return Counter(dict(
+        Post.objects.filter(group__in=groups)
+        .exclude(author__in=followed)
+        .exclude(author=user_id)
+        .order_by()
+        .values_list('author')
+        .annotate(Count('group', distinct=True))
+    ))
+
+
+def compute(user_id):
+    """Пересчитывает и сохраняет рекомендации пользователя."""
+    followed = set(
+        Follow.objects.filter(user=user_id).values_list('author', flat=True)
+    )
+    co_follows = co_follow_counts(user_id, followed)
+    shared_groups = shared_group_counts(user_id, followed)
+    scored = sorted(
+        (
+            (co_follows[author_id] * CO_FOLLOW_WEIGHT
+             + shared_groups[author_id] * SHARED_GROUP_WEIGHT, author_id)
+            for author_id in co_follows.keys() | shared_groups.keys()
+        ),
+        key=lambda item: (-item[0], item[1]),
+    )[:settings.SUGGESTIONS_PER_USER]
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user=user_id).delete()
+        FollowSuggestion.objects.bulk_create(
+            FollowSuggestion(
+                user_id=user_id,
+                author_id=author_id,
+                score=score,
+                co_follows=co_follows[author_id],
+                shared_groups=shared_groups[author_id],
+            )
+            for score, author_id in scored
+        )
+    bump(f'suggestions:{user_id}')
+    return len(scored)
+
+
+def schedule(*user_ids):
+    """Ставит пользователей в очередь на пересчёт рекомендаций.
+
+    Удалённые к этому моменту пользователи пропускаются.
+    """
+    existing = User.objects.filter(
+        pk__in=user_ids).values_list('pk', flat=True)
+    SuggestionRefresh.objects.bulk_create(
+        (SuggestionRefresh(user_id=user_id) for user_id in existing),
+        ignore_conflicts=True,
+    )
+
+
+def compute_queued(limit=None):
+    """Пересчитывает рекомендации пользователей из очереди.
+
+    Строки удаляются до пересчёта: подписка во время него снова
+    поставит пользователя в очередь. Возвращает число пользователей.
+    """
+    with transaction.atomic():
+        queued = SuggestionRefresh.objects.order_by(
+            'queued').values_list('user', flat=True)
+        user_ids = list(queued[:limit] if limit else queued)
+        SuggestionRefresh.objects.filter(user__in=user_ids).delete()
+    for number, user_id in enumerate(user_ids):
+        try:
+            compute(user_id)
+        except Exception:
+            schedule(*user_ids[number:])
+            raise
+    return len(user_ids)
+
+
+def discard(user_id, author_id):
+    """Убирает автора, на которого пользователь только что подписался."""
+    FollowSuggestion.objects.filter(user=user_id, author=author_id).delete()
+    after_commit(bump, f'suggestions:{user_id}')
+
+
+def for_user(user):
+    """Первые рекомендации для вывода на странице."""
+    if not user.is_authenticated:
+        return []
+    return list(
+        FollowSuggestion.objects.filter(user=user.pk)
+        .select_related('author')[:settings.SUGGESTIONS_SHOWN]
+    )
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.utils import encode_cursor
+
+register = template.Library()
+
+
+@register.filter
+def cursor(post):
+    """Курсор (pub_date, id) поста для запросов к ленте."""
+    return encode_cursor(post)
@@ -0,0 +1,18 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(items, attribute=None):
+    """Карточки постов ленты из кеша карточек, разделённые <hr>.
+
+    attribute - имя атрибута с постом, если элементы ленты не посты.
+    """
+    posts = [
+        getattr(item, attribute) if attribute else item for item in items
+    ]
+    return mark_safe('<hr>'.join(render_cards(posts)))
@@ -0,0 +1,55 @@
+import logging
+
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+from sorl.thumbnail import get_thumbnail
+
+from posts.thumbnails import ASPECT, WIDTHS, geometry
+
+register = template.Library()
+logger = logging.getLogger(__name__)
+
+SIZES = f'(max-width: {WIDTHS[-1]}px) 100vw, {WIDTHS[-1]}px'
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+
+def srcset(variants):
+    # url() файлового хранилища лишь склеивает строку, без обращений к диску.
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w' for width, name in variants)
+
+
+@register.simple_tag
+def post_picture(post, css_class='card-img my-2'):
+    """<picture> со srcset из вариантов, записанных в посте.
+
+    Пока варианты не созданы, выводится миниатюра sorl, как раньше.
+    """
+    if not post.image:
+        return ''
+    variants = post.get_image_variants()
+    if 'JPEG' not in variants:
+        try:
+            thumbnail = get_thumbnail(
+                post.image, geometry(WIDTHS[-1]), crop='center',
+                upscale=True)
+        except Exception:
+            logger.exception('Миниатюра для %s не создана', post.image.name)
+            return ''
+        return format_html(
+            '<img class="{}" src="{}">', css_class, thumbnail.url)
+    fallback = variants['JPEG']
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((MIME_TYPES[image_format], srcset(items), SIZES)
+         for image_format, items in variants.items()
+         if image_format != 'JPEG'),
+    )
+    width, name = fallback[-1]
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}" loading="lazy" alt=""></picture>',
+        sources, css_class, default_storage.url(name), srcset(fallback),
+        SIZES, width, round(width * ASPECT),
+    )
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import Post
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = os.path.join(directory.name, 'bench.json')
+
+    def run_benchmark(self, posts=40, **options):
+        call_command(
+            'benchmark_views', posts=posts, comments=1, follows=3,
+            depths='1,2', repeat=1, in_place=True, output=self.output,
+            verbosity=0, **options
+        )
+        with open(self.output) as file:
+            return json.load(file)
+
+    def test_benchmark_reports_all_views(self):
+        """Замер возвращает результаты для всех лент на каждой глубине."""
+        report = self.run_benchmark()
+        self.assertEqual(report['meta']['posts'], 40)
+        for name in ('index@1', 'index@2', 'group_posts@1', 'profile@2',
+                     'follow_index@2', 'post_detail'):
+            with self.subTest(name=name):
+                self.assertIn(name, report['results'])
+                self.assertGreater(report['results'][name]['queries'], 0)
+
+    def test_benchmark_detects_regression(self):
+        """Сравнение с эталоном падает при замедлении."""
+        report = self.run_benchmark()
+        for result in report['results'].values():
+            result['median_ms'] = 0.001
+        with open(self.output, 'w') as file:
+            json.dump(report, file)
+        baseline = self.output + '.baseline'
+        os.rename(self.output, baseline)
+        with self.assertRaises(CommandError):
+            self.run_benchmark(baseline=baseline)
+
+    def test_benchmark_tops_up_existing_data(self):
+        """Повторный запуск с большим --posts дополняет базу."""
+        self.run_benchmark()
+        report = self.run_benchmark(posts=60)
+        self.assertEqual(report['meta']['posts'], 60)
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertEqual(len(set(dates)), 60)
+
+    def test_benchmark_keeps_site_cache(self):
+        """Замер не очищает кеш сайта и не пишет в него."""
+        cache.clear()
+        cache.set('site-key', 'значение')
+        self.run_benchmark()
+        self.assertEqual(cache.get('site-key'), 'значение')
+        self.assertIsNone(cache.get('generation:posts'))
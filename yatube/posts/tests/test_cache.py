@@ -1,8 +1,15 @@
+from unittest import mock
+
 from django.core.cache import cache
+from django.template import Context, Template
+from django.template.loader import render_to_string
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from posts.models import Post, User, Follow
+from posts.cache import generation
+from posts.cards import card_key
+from posts.models import Follow, Group, Post, User
+from posts.utils import encode_cursor
 
 
 class TestCachPost(TestCase):
@@ -13,12 +20,30 @@ class TestCachPost(TestCase):
         cls.follower = User.objects.create_user(username='Alice')
 
     def setUp(self):
+        # TestCase не выполняет on_commit, а сигналы сбрасывают кеш в нём.
+        on_commit = mock.patch('django.db.transaction.on_commit',
+                               side_effect=lambda callback: callback())
+        on_commit.start()
+        self.addCleanup(on_commit.stop)
         self.client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         self.authorized_follower = Client()
         self.authorized_follower.force_login(self.follower)
 
+    def test_generations_bumped_after_commit(self):
+        """Поколения областей меняются только после фиксации транзакции."""
+        post = Post.objects.create(author=self.user, text='Исходный текст')
+        scopes = ('posts', f'post:{post.pk}', f'author:{self.user.pk}')
+        before = generation(*scopes)
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            post.text = 'Новый текст'
+            post.save()
+        self.assertEqual(generation(*scopes), before)
+        for (callback,), _ in on_commit.call_args_list:
+            callback()
+        self.assertNotEqual(generation(*scopes), before)
+
     def test_cach_works_correctly(self):
         """Проверка корректной работы кеширования страницы."""
         cache.clear()
@@ -30,25 +55,24 @@ class TestCachPost(TestCase):
         self.assertEqual(
             response_1.context['page_obj'][0].text, another_post.text
         )
-        post = Post.objects.create(
-            author=self.user,
-            text='Новый пост',
-        )
-        another_post.delete()
+        Post.objects.filter(pk=another_post.pk).update(text='Без сигналов')
         response_2 = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(
             response_1.content, response_2.content
         )
-        self.assertNotEqual(
-            response_1.context['page_obj'][0].text, post.text
+        post = Post.objects.create(
+            author=self.user,
+            text='Новый пост',
         )
-        cache.clear()
+        another_post.delete()
         response_3 = self.authorized_client.get(reverse('posts:index'))
-        self.assertEqual(
-            response_3.context['page_obj'][0].text, post.text
+        self.assertNotEqual(
+            response_1.content, response_3.content
         )
-        
-def test_cache_follow_works_correctly(self):
+        self.assertContains(response_3, post.text)
+        self.assertNotContains(response_3, another_post.text)
+
+    def test_cache_follow_works_correctly(self):
         """Проверка корректной работы кеширования страницы."""
         cache.clear()
         self.follow = Follow.objects.create(
@@ -59,24 +83,204 @@ def test_cache_follow_works_correctly(self):
             author=self.user,
             text='Еще один новый пост',
         )
-        response_1 = self.authorized_follower.get(reverse('posts:follow_index'))
+        response_1 = self.authorized_follower.get(
+            reverse('posts:follow_index'))
         self.assertEqual(
             response_1.context['page_obj'][0].text, another_post.text
         )
+        Post.objects.filter(pk=another_post.pk).update(text='Без сигналов')
+        response_2 = self.authorized_follower.get(
+            reverse('posts:follow_index'))
+        self.assertEqual(
+            response_1.content, response_2.content
+        )
         post = Post.objects.create(
             author=self.user,
             text='Новый пост',
         )
         another_post.delete()
-        response_2 = self.authorized_follower.get(reverse('posts:follow_index'))
-        self.assertEqual(
-            response_1.content, response_2.content
+        response_3 = self.authorized_follower.get(
+            reverse('posts:follow_index'))
+        self.assertContains(response_3, post.text)
+        self.assertNotContains(response_3, another_post.text)
+
+    def test_cache_invalidated_by_post_edit(self):
+        """Редактирование поста сразу видно на страницах группы и автора."""
+        cache.clear()
+        group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
         )
-        self.assertNotEqual(
-            response_1.context['page_obj'][0].text, post.text
+        post = Post.objects.create(
+            author=self.user,
+            text='Исходный текст',
+            group=group,
+        )
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            self.client.get(url)
+        post.text = 'Исправленный текст'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), post.text)
+
+    def test_conditional_get(self):
+        """Неизменившиеся страницы отдают 304, изменения меняют ETag."""
+        cache.clear()
+        post = Post.objects.create(author=self.user, text='Исходный текст')
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                other_user = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(other_user.status_code, 200)
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        Post.objects.create(author=self.user, text='Новый пост')
+        post.text = 'Исправленный текст'
+        post.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_rename_changes_feed_etags(self):
+        """Смена имени автора меняет ETag главной и его групп."""
+        cache.clear()
+        group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
+        )
+        author = User.objects.create_user(username='Author')
+        Post.objects.create(author=author, text='Исходный текст', group=group)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
         )
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        author.username = 'Renamed'
+        author.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertContains(response, 'Renamed')
+
+    def test_new_posts_fragment(self):
+        """Новые посты приходят фрагментом, без новых - 204 из кеша."""
         cache.clear()
-        response_3 = self.authorized_follower.get(reverse('posts:follow_index'))
+        post = Post.objects.create(author=self.user, text='Исходный текст')
+        response = self.client.get(reverse('posts:index'))
+        since = encode_cursor(post)
+        self.assertContains(response, f'data-since="{since}"')
+        url = reverse('posts:new_posts')
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.client.get(url, {'since': since})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'since': since})
+        self.assertEqual(response.status_code, 204)
+        # TestCase не выполняет on_commit, а курсор сбрасывается в нём.
+        with mock.patch('django.db.transaction.on_commit',
+                        side_effect=lambda callback: callback()):
+            new_post = Post.objects.create(
+                author=self.user, text='Новый пост')
+        response = self.client.get(url, {'since': since})
+        self.assertTemplateUsed(response, 'includes/post_card.html')
+        self.assertContains(response, new_post.text)
+        self.assertNotContains(response, post.text)
         self.assertEqual(
-            response_3.context['page_obj'][0].text, post.text
+            response['X-Latest-Cursor'], encode_cursor(new_post))
+
+    def test_post_cards_shared_between_feeds(self):
+        """Карточка поста кешируется одна на все ленты и по версии."""
+        cache.clear()
+        group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
+        )
+        post = Post.objects.create(
+            author=self.user, text='Исходный текст', group=group)
+        Post.objects.create(author=self.user, text='Другой пост')
+        self.client.get(reverse('posts:index'))
+        self.assertIn(post.text, cache.get(card_key(post)))
+        with mock.patch('posts.cards.render_to_string') as render:
+            response = self.client.get(
+                reverse('posts:group_list', kwargs={'slug': group.slug}))
+        render.assert_not_called()
+        self.assertContains(response, post.text)
+        post.text = 'Исправленный текст'
+        post.save()
+        with mock.patch('posts.cards.render_to_string',
+                        wraps=render_to_string) as render:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(render.call_count, 1)
+        self.assertContains(response, post.text)
+
+    def test_post_cards_follow_group_and_author_changes(self):
+        """Карточки обновляются при смене группы и имени автора."""
+        cache.clear()
+        group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
         )
+        Post.objects.create(
+            author=self.user, text='Исходный текст', group=group)
+        url = reverse('posts:index')
+        self.client.get(url)
+        group.slug = 'new-slug'
+        group.save()
+        self.assertContains(
+            self.client.get(url),
+            reverse('posts:group_list', kwargs={'slug': 'new-slug'}))
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        self.assertContains(self.client.get(url), 'Переименованный')
+        group.delete()
+        self.assertNotContains(
+            self.client.get(url),
+            reverse('posts:group_list', kwargs={'slug': 'new-slug'}))
+
+    def test_profile_follows_group_changes(self):
+        """Профиль автора обновляется при смене и удалении группы."""
+        cache.clear()
+        group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
+        )
+        Post.objects.create(
+            author=self.user, text='Исходный текст', group=group)
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        self.client.get(url)
+        group.slug = 'new-slug'
+        group.save()
+        new_url = reverse('posts:group_list', kwargs={'slug': 'new-slug'})
+        self.assertContains(self.client.get(url), new_url)
+        group.delete()
+        self.assertNotContains(self.client.get(url), new_url)
+
+    def test_post_cards_separated(self):
+        """Карточки разделяются <hr>, после последней его нет."""
+        cache.clear()
+        posts = [
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+            for number in range(2)
+        ]
+        html = Template('{% load post_cards %}{% post_cards posts %}').render(
+            Context({'posts': posts}))
+        self.assertEqual(html.count('<hr>'), 1)
+        self.assertFalse(html.strip().endswith('<hr>'))
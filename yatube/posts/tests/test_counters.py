@@ -0,0 +1,118 @@
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        cls.follower = User.objects.create_user(username='Alice')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.another_group = Group.objects.create(
+            title='Другая группа',
+            slug='another-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(obj, field), value)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются вместе с постами, комментариями, подписками."""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый текст', group=self.group)
+        Comment.objects.create(
+            post=post, author=self.follower, text='Комментарий')
+        Follow.objects.create(user=self.follower, author=self.user)
+        self.assertCounters(self.user.stats, posts_count=1, followers_count=1)
+        self.assertCounters(self.follower.stats, following_count=1)
+        self.assertCounters(self.group, posts_count=1)
+        self.assertCounters(post, comments_count=1)
+        post.group = self.another_group
+        post.save()
+        self.assertCounters(self.group, posts_count=0)
+        self.assertCounters(self.another_group, posts_count=1)
+        Follow.objects.all().delete()
+        post.delete()
+        self.assertCounters(
+            self.user.stats, posts_count=0, followers_count=0)
+        self.assertCounters(self.follower.stats, following_count=0)
+        self.assertCounters(self.another_group, posts_count=0)
+
+    def test_reconcile_repairs_drift(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый текст', group=self.group)
+        UserStats.objects.filter(user=self.user).update(posts_count=42)
+        Group.objects.update(posts_count=7)
+        UserStats.objects.filter(user=self.follower).delete()
+        call_command('reconcile_counters', verbosity=0)
+        self.assertCounters(self.user.stats, posts_count=1)
+        self.assertCounters(self.group, posts_count=1)
+        self.assertCounters(self.another_group, posts_count=0)
+        self.assertCounters(post, comments_count=0)
+        self.assertTrue(
+            UserStats.objects.filter(user=self.follower).exists())
+
+    def test_profile_reads_stored_count(self):
+        """Профиль выводит сохранённый счётчик без COUNT-запроса."""
+        Post.objects.create(author=self.user, text='Тестовый текст')
+        UserStats.objects.filter(user=self.user).update(posts_count=42)
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': self.user}))
+        self.assertContains(response, 'Всего постов: 42')
+
+    def test_full_save_keeps_counters(self):
+        """Полное сохранение не затирает счётчики устаревшим значением."""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый текст', group=self.group)
+        stale_post = Post.objects.get(pk=post.pk)
+        stale_group = Group.objects.get(pk=self.group.pk)
+        Comment.objects.create(
+            post=post, author=self.follower, text='Комментарий')
+        Post.objects.create(
+            author=self.follower, text='Другой текст', group=self.group)
+        stale_post.text = 'Новый текст'
+        stale_post.save()
+        stale_group.description = 'Новое описание'
+        stale_group.save()
+        self.assertCounters(
+            post, comments_count=1, text='Новый текст')
+        self.assertCounters(
+            self.group, posts_count=2, description='Новое описание')
+
+    def test_missing_stats_row_created(self):
+        """Счётчик пользователя без строки UserStats создаёт её."""
+        UserStats.objects.filter(user=self.user).delete()
+        Post.objects.create(author=self.user, text='Тестовый текст')
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).posts_count, 1)
+
+    def test_pages_create_missing_stats(self):
+        """Профиль и пост автора без UserStats создают строку."""
+        post = Post.objects.create(author=self.user, text='Тестовый текст')
+        UserStats.objects.filter(user=self.user).delete()
+        urls = (
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                UserStats.objects.filter(user=self.user).delete()
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertCounters(self.user.stats, posts_count=1)
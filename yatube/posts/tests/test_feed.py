@@ -0,0 +1,189 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import feed, follows
+from posts.models import FeedEntry, FeedFanOut, Follow, Post, User
+
+
+class FeedFanOutTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='HaHaHa')
+        cls.follower = User.objects.create_user(username='Alice')
+        cls.stranger = User.objects.create_user(username='Hater')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки',
+        )
+        cls.follow = Follow.objects.create(
+            user=cls.follower,
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def feed_of(self, user):
+        return list(feed.feed_page(user, Post.objects.all()))
+
+    def test_follow_backfills_inbox(self):
+        """Подписка переносит старые посты автора в ленту."""
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.follower, post=self.old_post).exists())
+        self.assertEqual(self.feed_of(self.follower), [self.old_post])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост появляется только в лентах подписчиков."""
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.feed_of(self.follower)[0], post)
+        self.assertEqual(self.feed_of(self.stranger), [])
+
+    def test_unfollow_and_delete_clean_inbox(self):
+        """Отписка и удаление поста убирают записи из ленты."""
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        post.delete()
+        self.assertEqual(self.feed_of(self.follower), [self.old_post])
+        Follow.objects.filter(user=self.follower).delete()
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.follower).exists())
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=0)
+    def test_celebrity_posts_read_without_fan_out(self):
+        """Посты популярного автора читаются запросом по подпискам."""
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed_of(self.follower)[0], post)
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=1)
+    def test_former_celebrity_posts_fanned_out(self):
+        """Посты автора, ставшего непопулярным, раскладываются в ленты."""
+        Follow.objects.create(user=self.stranger, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        with mock.patch('django.db.transaction.on_commit',
+                        side_effect=lambda callback: callback()):
+            Follow.objects.filter(user=self.stranger).delete()
+        self.assertTrue(FeedFanOut.objects.filter(author=self.author))
+        self.assertEqual(self.feed_of(self.follower), [post, self.old_post])
+        call_command('rebuild_feeds', queued=True, verbosity=0)
+        self.assertFalse(FeedFanOut.objects.exists())
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.follower, post=post).exists())
+        self.assertEqual(self.feed_of(self.follower), [post, self.old_post])
+
+    def test_feed_pages_merge_celebrity_posts(self):
+        """Курсор ведёт по разложенным постам и постам популярных."""
+        celebrity = User.objects.create_user(username='Star')
+        with override_settings(FEED_CELEBRITY_FOLLOWERS=1):
+            Follow.objects.create(user=self.follower, author=celebrity)
+            Follow.objects.create(user=self.stranger, author=celebrity)
+            for number in range(2):
+                Post.objects.create(author=self.author, text=f'Пост {number}')
+                Post.objects.create(author=celebrity, text=f'Звезда {number}')
+            self.assertFalse(
+                FeedEntry.objects.filter(author=celebrity).exists())
+            expected = list(Post.objects.filter(
+                author__in=[self.author, celebrity]
+            ).order_by('-pub_date', '-pk'))
+            shown, cursor = [], None
+            while True:
+                page = feed.feed_page(
+                    self.follower, Post.objects.all(), after=cursor,
+                    per_page=2)
+                shown += list(page)
+                if not page.has_next():
+                    break
+                cursor = page.next_cursor
+            self.assertEqual(shown, expected)
+            page = feed.feed_page(
+                self.follower, Post.objects.all(), before=cursor,
+                per_page=2)
+            self.assertEqual(list(page), expected[1:3])
+
+    def test_rebuild_command_restores_inbox(self):
+        """Команда rebuild_feeds восстанавливает ленту."""
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', verbosity=0)
+        self.assertEqual(self.feed_of(self.follower), [self.old_post])
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='HaHaHa')
+        cls.follower = User.objects.create_user(username='Alice')
+        cls.stranger = User.objects.create_user(username='Hater')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_following_ids_loaded_once(self):
+        """Подписки читаются из базы один раз, дальше из кеша."""
+        with self.assertNumQueries(1):
+            follows.following_ids(self.follower.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follows.is_following(self.follower.pk, self.author.pk))
+            self.assertEqual(
+                follows.followed_among(
+                    self.follower.pk, {self.author.pk, self.stranger.pk}),
+                {self.author.pk},
+            )
+
+    def test_follow_and_unfollow_reset_cached_set(self):
+        """Подписка и отписка сбрасывают множество после фиксации."""
+        follows.following_ids(self.follower.pk)
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            Follow.objects.create(user=self.follower, author=self.stranger)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                follows.following_ids(self.follower.pk), {self.author.pk})
+        for (callback,), _ in on_commit.call_args_list:
+            callback()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                follows.following_ids(self.follower.pk),
+                {self.author.pk, self.stranger.pk},
+            )
+        with mock.patch('django.db.transaction.on_commit',
+                        side_effect=lambda callback: callback()):
+            Follow.objects.filter(
+                user=self.follower, author=self.author).delete()
+        self.assertEqual(
+            follows.following_ids(self.follower.pk), {self.stranger.pk})
+
+    def test_follow_ignores_stale_cache(self):
+        """Подписка при устаревшем кеше не создаёт повторную запись."""
+        client = Client()
+        client.force_login(self.follower)
+        cache.set(follows.FOLLOWING_KEY.format(self.follower.pk),
+                  frozenset())
+        client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.author.username}))
+        self.assertEqual(
+            Follow.objects.filter(
+                user=self.follower, author=self.author).count(),
+            1,
+        )
+
+    def test_profile_follow_state_from_cache(self):
+        """Кнопка подписки в профиле не запрашивает Follow."""
+        client = Client()
+        client.force_login(self.follower)
+        follows.following_ids(self.follower.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse(
+                'posts:profile', kwargs={'username': self.author.username}))
+        self.assertTrue(response.context['following'])
+        self.assertFalse(any(
+            '"posts_follow"' in query['sql'] for query in queries))
@@ -1,15 +1,20 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.forms import PostForm
+from posts.images import output_name
 from posts.models import Comment, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+UPLOAD_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -54,7 +59,7 @@ class PostFormTests(TestCase):
         self.assertEqual(last_post.author, form_data['author'])
         self.assertEqual(last_post.text, form_data['text'])
         self.assertEqual(last_post.group.pk, form_data['group'])
-        uploaded_image = form_data['image'].name
+        uploaded_image = output_name(form_data['image'].name)
         self.assertEqual(last_post.image, f'posts/{uploaded_image}')
 
     def test_create_post(self):
@@ -82,7 +87,7 @@ class PostFormTests(TestCase):
             author=self.user,
             text=self.post.text,
             group=self.group.pk,
-            image=f'posts/{uploaded.name}'
+            image=f'posts/{output_name(uploaded.name)}'
         ).exists(), ('Пост не был создан'))
         self.data_for_test_of_post_form(form_data)
 
@@ -113,7 +118,7 @@ class PostFormTests(TestCase):
             author=self.user,
             text='Совсем новый текст',
             group=self.group.pk,
-            image=f'posts/{uploaded.name}'
+            image=f'posts/{output_name(uploaded.name)}'
         ).exists())
         self.data_for_test_of_post_form(form_data)
 
@@ -187,3 +192,59 @@ class CommentFormTests(TestCase):
         )
         self.assertNotIn(form_data['text'], response.content.decode())
         self.assertEqual(Comment.objects.count(), self.comment_count)
+
+
+@override_settings(MEDIA_ROOT=UPLOAD_MEDIA_ROOT, POST_IMAGE_MAX_SIZE=100)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(UPLOAD_MEDIA_ROOT, ignore_errors=True)
+
+    def make_jpeg(self, size, exif=None):
+        output = BytesIO()
+        image = Image.new('RGB', size, 'red')
+        if exif is not None:
+            image.save(output, 'JPEG', exif=exif)
+        else:
+            image.save(output, 'JPEG')
+        return SimpleUploadedFile(
+            'photo.jpg', output.getvalue(), content_type='image/jpeg')
+
+    def form(self, upload):
+        return PostForm(data={'text': 'Пост'}, files={'image': upload})
+
+    def test_image_downscaled_and_stripped(self):
+        """Изображение уменьшается, перекодируется и теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        form = self.form(self.make_jpeg((400, 200), exif=exif.tobytes()))
+        self.assertTrue(form.is_valid(), form.errors)
+        image_file = form.cleaned_data['image']
+        self.assertEqual(image_file.name, output_name('photo.jpg'))
+        with Image.open(image_file) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_stored_image_readable(self):
+        """Сохранённое изображение доступно веб-серверу на чтение."""
+        form = self.form(self.make_jpeg((400, 200)))
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(commit=False)
+        post.author = User.objects.create_user(username='HaHaHa')
+        post.save()
+        mode = os.stat(post.image.path).st_mode & 0o777
+        self.assertEqual(mode, 0o644)
+
+    def test_broken_image_rejected(self):
+        """Файл, не являющийся изображением, отклоняется."""
+        upload = SimpleUploadedFile(
+            'photo.jpg', b'not an image', content_type='image/jpeg')
+        self.assertIn('image', self.form(upload).errors)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_huge_image_rejected_by_header(self):
+        """Слишком большое изображение отклоняется по заголовку."""
+        form = self.form(self.make_jpeg((100, 100)))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code, 'too_large')
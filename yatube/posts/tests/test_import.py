@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.bulk import reserve_ids
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        with open(os.path.join(self.directory, 'small.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        self.path = os.path.join(self.directory, 'data.jsonl')
+
+    def write_records(self, records):
+        with open(self.path, 'w') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def run_import(self, **options):
+        # TestCase не выполняет on_commit, а копирование изображений
+        # идёт после коммита пачки.
+        with mock.patch('django.db.transaction.on_commit',
+                        side_effect=lambda callback: callback()), \
+                mock.patch('posts.thumbnails.schedule') as schedule:
+            call_command('import_posts', self.path,
+                         images_dir=self.directory, batch_size=2,
+                         verbosity=0, **options)
+        return schedule
+
+    def test_import_posts_comments_and_follows(self):
+        """Импорт создаёт записи с датами источника и счётчиками."""
+        self.write_records([
+            {'type': 'post', 'id': 'a', 'text': 'Старый пост',
+             'author': 'HaHaHa', 'group': 'group-slug',
+             'pub_date': '2015-05-01T10:00:00+00:00', 'image': 'small.gif'},
+            {'type': 'post', 'id': 'b', 'text': 'Пост нового автора',
+             'author': 'Bob'},
+            {'type': 'comment', 'post': 'a', 'author': 'Bob',
+             'text': 'Комментарий', 'created': '2015-05-02T10:00:00'},
+            {'type': 'follow', 'user': 'Bob', 'author': 'HaHaHa'},
+            {'type': 'follow', 'user': 'Bob', 'author': 'HaHaHa'},
+        ])
+        schedule = self.run_import(create_users=True)
+        post = Post.objects.get(text='Старый пост')
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group, self.group)
+        self.assertTrue(post.image.name.startswith('posts/small'))
+        schedule.assert_called_once_with(post.pk, post.image.name)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().created.year, 2015)
+        bob = User.objects.get(username='Bob')
+        self.assertEqual(Follow.objects.filter(user=bob).count(), 1)
+        self.assertEqual(FeedEntry.objects.filter(user=bob).count(), 1)
+        self.assertEqual(User.objects.get(pk=self.user.pk)
+                         .stats.followers_count, 1)
+
+    def test_import_resumes_from_progress(self):
+        """Повторный запуск продолжает импорт после сохранённых пачек."""
+        records = [
+            {'type': 'post', 'id': str(number), 'text': f'Пост {number}',
+             'author': 'HaHaHa'}
+            for number in range(4)
+        ]
+        self.write_records(records[:2])
+        self.run_import()
+        self.write_records(records + [
+            {'type': 'comment', 'post': '0', 'author': 'HaHaHa',
+             'text': 'Комментарий к первому'},
+        ])
+        self.run_import()
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(
+            Comment.objects.get().post, Post.objects.get(text='Пост 0'))
+
+    def test_reserved_ids_skipped_by_site(self):
+        """Посты сайта не занимают id, зарезервированные импортом."""
+        reserved = reserve_ids(Post, 3)
+        post = Post.objects.create(author=self.user, text='Живой пост')
+        self.assertGreater(post.pk, reserved[-1])
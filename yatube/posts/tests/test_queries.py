@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import (
+    QueryBudgetExceeded, count_queries, query_budget, uncounted,
+)
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post, User
+
+POSTS_QUANTITY = 15
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        cls.follower = User.objects.create_user(username='Alice')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        for number in range(POSTS_QUANTITY):
+            cls.post = Post.objects.create(
+                author=cls.user,
+                text=f'Пост {number}',
+                group=cls.group,
+            )
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.follower,
+                text=f'Комментарий {number}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+
+    def test_feed_views_within_budget(self):
+        """Ленты и страница поста укладываются в бюджет запросов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertWithinQueryBudget(self.authorized_client, url)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_middleware_rejects_budget_overrun(self):
+        """Middleware падает при превышении бюджета в строгом режиме."""
+        url = reverse('posts:index')
+        view = self.client.get(url).resolver_match.func
+        original = view.query_budget
+        query_budget(0)(view)
+        try:
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(url)
+        finally:
+            query_budget(original)(view)
+
+    def test_middleware_logs_budget_overrun(self):
+        """Превышение бюджета пишется в лог и без DEBUG."""
+        url = reverse('posts:index')
+        view = self.client.get(url).resolver_match.func
+        original = view.query_budget
+        query_budget(0)(view)
+        try:
+            with self.assertLogs('core.queries', 'WARNING'):
+                self.client.get(url)
+        finally:
+            query_budget(original)(view)
+
+    def test_uncounted_queries_excluded(self):
+        """Запросы в блоке uncounted не входят в бюджет."""
+        with count_queries() as counter:
+            User.objects.count()
+            with uncounted():
+                User.objects.count()
+        self.assertEqual(counter.count, 1)
+        self.assertEqual(counter.excluded, 1)
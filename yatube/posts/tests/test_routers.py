@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from core.middleware import STICKY_COOKIE, ReplicaMiddleware
+from core.routers import ReplicaRouter, use_replica
+from posts import follows
+from posts.models import Follow, Post, User
+from posts.utils import encode_cursor, latest_cursor
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(self, request):
+        """Базу, выбранную для чтения во время обработки запроса."""
+        chosen = []
+
+        def view(request):
+            chosen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+        return chosen[0], response
+
+    def test_safe_requests_read_from_replica(self):
+        """GET без недавней записи читает с реплики."""
+        database, response = self.route(self.factory.get('/'))
+        self.assertEqual(database, 'replica')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_reads_stick_to_primary_after_write(self):
+        """Запись и чтение после неё идут в основную базу."""
+        database, response = self.route(self.factory.post('/'))
+        self.assertEqual(database, 'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        database, _ = self.route(request)
+        self.assertEqual(database, 'default')
+
+    def test_reads_outside_requests_use_primary(self):
+        """Команды и фоновые потоки читают из основной базы."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+
+class ReplicaFileTests(TransactionTestCase):
+    """Реплика - отдельный файл SQLite, который обновляет sync_replica."""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(self.directory, 'replica.sqlite3'),
+        }
+        self.settings = override_settings(DATABASE_REPLICAS=['replica'])
+        self.settings.enable()
+        self.author = User.objects.create_user(username='HaHaHa')
+        self.reader = User.objects.create_user(username='Alice')
+        Post.objects.create(author=self.author, text='Старый пост')
+        call_command('sync_replica', verbosity=0)
+        # Реплика отстаёт: этих записей в ней нет.
+        Post.objects.create(author=self.author, text='Новый пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        self.settings.disable()
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections._connections.replica
+        shutil.rmtree(self.directory, ignore_errors=True)
+        cache.clear()
+
+    def texts(self):
+        response = self.client.get(reverse('api:index'))
+        return [post['text'] for post in response.json()['results']]
+
+    def test_uncached_reads_use_replica(self):
+        """Лента API без кеша читается с реплики до синхронизации."""
+        self.assertEqual(self.texts(), ['Старый пост'])
+        call_command('sync_replica', verbosity=0)
+        self.assertEqual(self.texts(), ['Новый пост', 'Старый пост'])
+
+    def test_feeds_read_from_replica_without_etag(self):
+        """Ленты читаются с реплики, но такой ответ идёт без ETag."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Новый пост')
+        self.assertFalse(response.has_header('ETag'))
+        self.client.cookies[STICKY_COOKIE] = '1'
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый пост')
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_cached_data_read_from_primary(self):
+        """В кеш не попадают данные отставшей реплики."""
+        response = self.client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+        self.assertContains(response, 'Новый пост')
+        use_replica(True)
+        try:
+            self.assertEqual(
+                follows.following_ids(self.reader.pk), {self.author.pk})
+            self.assertEqual(
+                latest_cursor(Post.objects.all(), 'latest:test'),
+                encode_cursor(Post.objects.using('default').first()),
+            )
+        finally:
+            use_replica(False)
@@ -0,0 +1,90 @@
+from django.contrib.admin.sites import site
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Group, Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        cls.another_user = User.objects.create_user(username='Alice')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Жирафы едят листья акации',
+            group=cls.group,
+        )
+        cls.another_post = Post.objects.create(
+            author=cls.another_user,
+            text='Жирафы, жирафы и снова жирафы',
+        )
+        cls.commented_post = Post.objects.create(
+            author=cls.another_user,
+            text='Пост без ключевых слов',
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.commented_post,
+            author=cls.user,
+            text='А здесь про акации',
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_search_ranks_and_filters(self):
+        """Поиск находит посты по тексту и комментариям, учитывает
+            фильтры по группе и автору."""
+        self.assertEqual(
+            list(search.search('жирафы')), [self.another_post, self.post])
+        self.assertEqual(
+            set(search.search('акации')), {self.post, self.commented_post})
+        self.assertEqual(
+            list(search.search('акации', group_id=self.group.pk)),
+            [self.post])
+        self.assertEqual(
+            list(search.search('жирафы', author_id=self.user.pk)),
+            [self.post])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении записей."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Слоны'
+        post.save()
+        self.assertEqual(list(search.search('слоны')), [post])
+        self.assertNotIn(post, search.search('жирафы'))
+        Post.objects.filter(pk=self.commented_post.pk).delete()
+        self.assertEqual(list(search.search('акации')), [])
+
+    def test_search_cursor_pagination(self):
+        """Результаты листаются курсором без повторов."""
+        first = search.search('жирафы', per_page=1)
+        second = search.search('жирафы', after=first.next_cursor, per_page=1)
+        self.assertEqual(list(first) + list(second),
+                         [self.another_post, self.post])
+        self.assertFalse(second.has_next())
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты."""
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'акации', 'author': 'Alice'})
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(
+            list(response.context['page_obj']), [self.commented_post])
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт через полнотекстовый индекс."""
+        request = RequestFactory().get('/')
+        for model, expected in ((Post, self.post),
+                                (Comment, self.comment)):
+            with self.subTest(model=model):
+                queryset, _ = site._registry[model].get_search_results(
+                    request, model.objects.all(), 'акации')
+                self.assertIn(expected, queryset)
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {
+            'OPTIONS': {'MAX_ENTRIES': 100, 'CULL_FREQUENCY': 10, **options},
+        })
+
+    def test_values_shared_between_instances(self):
+        """Записи одного экземпляра видны другому (другому процессу)."""
+        self.cache.set_many({'a': {'text': 'пост'}, 'b': 2})
+        other = self.make_cache()
+        self.assertEqual(
+            other.get_many(['a', 'b', 'c']), {'a': {'text': 'пост'}, 'b': 2})
+        other.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_add_and_expiry(self):
+        """add не перезаписывает живую запись, просроченные не видны."""
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+        self.cache.set('short', 'значение', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 'новое'))
+
+    def test_incr_is_atomic(self):
+        """incr из нескольких потоков не теряет приращений."""
+        self.cache.set('counter', 0)
+
+        def work():
+            cache = self.make_cache()
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction(self):
+        """При превышении лимита вытесняются давно не читавшиеся записи."""
+        self.cache.set_many({f'old{number}': number for number in range(50)})
+        self.cache._connection.execute('UPDATE cache SET accessed = 0')
+        self.cache.get('old0')
+        self.cache.set_many({f'new{number}': number for number in range(60)})
+        entries, _ = self.cache._connection.execute(
+            'SELECT entries, bytes FROM cache_stats').fetchone()
+        self.assertLessEqual(entries, 100)
+        self.assertEqual(self.cache.get('old0'), 0)
+        self.assertIsNone(self.cache.get('old1'))
+        self.assertEqual(self.cache.get('new59'), 59)
+
+    def test_size_limit(self):
+        """Объём кеша ограничен MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=10000)
+        for number in range(20):
+            cache.set(f'big{number}', 'x' * 1000)
+        _, size = cache._connection.execute(
+            'SELECT entries, bytes FROM cache_stats').fetchone()
+        self.assertLessEqual(size, 10000)
+        self.assertIsNotNone(cache.get('big19'))
+
+    def test_incr_without_returning(self):
+        """На SQLite старше 3.35 incr обходится без RETURNING."""
+        self.cache._returning = False
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.get('counter'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_old_sqlite_rejected(self):
+        """Без поддержки ON CONFLICT бэкенд не создаётся."""
+        with mock.patch('sqlite3.sqlite_version_info', (3, 22, 0)):
+            with self.assertRaises(ImproperlyConfigured):
+                self.make_cache()
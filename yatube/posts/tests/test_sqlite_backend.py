@@ -0,0 +1,54 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+
+class TunedSqliteTests(TestCase):
+    def test_pragmas_applied(self):
+        """Соединение открывается с настроенными pragma."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            # 1 - NORMAL.
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_benchmark_command(self):
+        """Замер конкурентной записи выводит оба бэкенда без ошибок."""
+        output = StringIO()
+        call_command('benchmark_sqlite', threads=2, transactions=5,
+                     stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith('stock'))
+        self.assertTrue(lines[2].startswith('tuned'))
+        self.assertTrue(lines[2].endswith(' 0'))
+
+
+class BeginImmediateTests(TransactionTestCase):
+    def test_begin_retried_while_locked(self):
+        """BEGIN IMMEDIATE повторяется, пока база заблокирована."""
+        attempts = []
+        original = connection.cursor
+
+        def cursor():
+            wrapped = original()
+            execute = wrapped.execute
+
+            def locked_execute(sql, params=None):
+                if sql == 'BEGIN IMMEDIATE':
+                    attempts.append(sql)
+                    if len(attempts) < 3:
+                        raise OperationalError('database is locked')
+                return execute(sql, params)
+
+            wrapped.execute = locked_execute
+            return wrapped
+
+        with mock.patch.object(connection, 'cursor', cursor), \
+                mock.patch('time.sleep'):
+            with transaction.atomic():
+                pass
+        self.assertEqual(len(attempts), 3)
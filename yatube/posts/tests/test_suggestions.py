@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import suggestions
+from posts.models import (
+    Follow, FollowSuggestion, Group, Post, SuggestionRefresh, User,
+)
+
+
+class FollowSuggestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        cls.author = User.objects.create_user(username='Author')
+        cls.peer = User.objects.create_user(username='Alice')
+        cls.co_followed = User.objects.create_user(username='Bob')
+        cls.neighbour = User.objects.create_user(username='Carol')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Follow.objects.create(user=cls.peer, author=cls.author)
+        Follow.objects.create(user=cls.peer, author=cls.co_followed)
+        Post.objects.create(
+            author=cls.author, text='Пост автора', group=cls.group)
+        Post.objects.create(
+            author=cls.neighbour, text='Пост соседа', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def suggested(self, user):
+        return list(FollowSuggestion.objects.filter(
+            user=user).values_list('author', 'co_follows', 'shared_groups'))
+
+    def test_compute_scores_co_follows_and_groups(self):
+        """Рекомендации учитывают общих подписчиков и общие группы."""
+        call_command('compute_suggestions', verbosity=0)
+        self.assertEqual(self.suggested(self.user), [
+            (self.neighbour.pk, 0, 1),
+            (self.co_followed.pk, 1, 0),
+        ])
+
+    def test_follow_queues_refresh(self):
+        """Подписка сразу убирает автора, пересчёт идёт из очереди."""
+        suggestions.compute(self.user.pk)
+        with mock.patch.object(suggestions, 'compute') as compute:
+            Follow.objects.create(user=self.user, author=self.neighbour)
+        compute.assert_not_called()
+        self.assertEqual(
+            self.suggested(self.user), [(self.co_followed.pk, 1, 0)])
+        self.assertTrue(
+            SuggestionRefresh.objects.filter(user=self.user).exists())
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        call_command('compute_suggestions', queued=True, verbosity=0)
+        self.assertFalse(SuggestionRefresh.objects.exists())
+        self.assertEqual(
+            self.suggested(self.user), [(self.author.pk, 0, 1)])
+
+    def test_deleting_follower(self):
+        """Удаление подписчика не ставит его в очередь пересчёта."""
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            self.peer.delete()
+        # Отложенные действия выполняются после удаления, как при фиксации.
+        for (callback,), _ in on_commit.call_args_list:
+            callback()
+        connection.check_constraints()
+        self.assertFalse(
+            SuggestionRefresh.objects.filter(user=self.peer.pk).exists())
+
+    def test_pages_show_suggestions(self):
+        """Профиль и лента подписок выводят рекомендации."""
+        suggestions.compute(self.user.pk)
+        client = Client()
+        client.force_login(self.user)
+        urls = (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(
+                    [item.author for item in response.context['suggestions']],
+                    [self.neighbour, self.co_followed],
+                )
+                self.assertContains(response, reverse(
+                    'posts:profile_follow', args=[self.neighbour.username]))
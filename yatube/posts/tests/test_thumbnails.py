@@ -0,0 +1,140 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_pregenerated_variants_used_by_template(self):
+        """Шаблон выводит записанные варианты без обращений к sorl."""
+        cache.clear()
+        call_command('generate_thumbnails', workers=1, verbosity=0)
+        variants = Post.objects.get(pk=self.post.pk).get_image_variants()
+        self.assertEqual(set(variants), set(thumbnails.FORMATS))
+        widths = [width for width, _ in variants['JPEG']]
+        self.assertEqual(widths, list(thumbnails.WIDTHS))
+        for _, name in variants['JPEG']:
+            self.assertTrue(default_storage.exists(name))
+        patch_thumbnail = mock.patch(
+            'posts.templatetags.post_images.get_thumbnail')
+        patch_exists = mock.patch.object(default_storage, 'exists')
+        with patch_thumbnail as get_thumbnail, patch_exists as exists:
+            response = self.client.get(reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}))
+        get_thumbnail.assert_not_called()
+        exists.assert_not_called()
+        self.assertContains(response, '<picture>')
+        for width, name in variants['JPEG']:
+            self.assertContains(
+                response, f'{default_storage.url(name)} {width}w')
+
+    def test_broken_image_skipped(self):
+        """Ошибка на одном изображении не останавливает остальные."""
+        broken = Post.objects.create(
+            author=self.user, text='Битый файл', image='posts/broken.gif')
+        record = thumbnails.record
+
+        def fail_on_broken(post_id, image_name):
+            if post_id == broken.pk:
+                raise OSError('broken image')
+            return record(post_id, image_name)
+
+        with mock.patch.object(thumbnails, 'record', fail_on_broken):
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                call_command('generate_thumbnails', workers=1,
+                             verbosity=0, stderr=StringIO())
+        self.assertTrue(
+            Post.objects.get(pk=self.post.pk).get_image_variants())
+        self.assertFalse(
+            Post.objects.get(pk=broken.pk).get_image_variants())
+
+    def test_new_image_resets_variants(self):
+        """Замена картинки сбрасывает варианты, правка текста - нет."""
+        post = Post.objects.get(pk=self.post.pk)
+        thumbnails.record(post.pk, post.image.name)
+        post.refresh_from_db()
+        post.text = 'Новый текст'
+        post.save()
+        self.assertNotEqual(post.image_variants, '')
+        post.image = SimpleUploadedFile(
+            name='new.gif', content=SMALL_GIF, content_type='image/gif')
+        post.save()
+        self.assertEqual(
+            Post.objects.get(pk=post.pk).image_variants, '')
+
+    def test_saving_image_schedules_thumbnails(self):
+        """Сохранение поста с новой картинкой ставит задачу в пул."""
+        with mock.patch.object(thumbnails, 'schedule') as schedule, \
+                mock.patch('posts.signals.transaction.on_commit',
+                           side_effect=lambda callback: callback()):
+            post = Post.objects.create(
+                author=self.user,
+                text='Ещё пост',
+                image=SimpleUploadedFile(
+                    name='other.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif'
+                )
+            )
+            post.text = 'Текст изменён, картинка та же'
+            post.save()
+        schedule.assert_called_once_with(post.pk, post.image.name)
+
+    def test_full_save_keeps_recorded_variants(self):
+        """Сохранение загруженного ранее поста не затирает варианты."""
+        stale = Post.objects.get(pk=self.post.pk)
+        thumbnails.record(self.post.pk, self.post.image.name)
+        stale.text = 'Правка из формы'
+        stale.save()
+        self.assertNotEqual(
+            Post.objects.get(pk=self.post.pk).image_variants, '')
+
+    def test_record_bumps_only_post_scope(self):
+        """Запись вариантов сбрасывает только кеш самого поста."""
+        with mock.patch.object(thumbnails, 'bump') as bump:
+            thumbnails.record(self.post.pk, self.post.image.name)
+        bump.assert_called_once_with(f'post:{self.post.pk}')
@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.timing import PHASES, histograms
+from posts.models import Group, Post, User
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='group-slug',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        histograms.reset()
+        self.client = Client()
+
+    def test_server_timing_header(self):
+        """Ответ содержит Server-Timing со всеми этапами запроса."""
+        response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for phase in PHASES + ('total',):
+            with self.subTest(phase=phase):
+                self.assertIn(f'{phase};dur=', header)
+        self.assertIn('queries"', header)
+
+    def test_metrics_endpoint(self):
+        """Эндпоинт метрик отдаёт гистограммы по view."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            content,
+        )
+        self.assertIn('phase="render"', content)
+
+    def test_metrics_forbidden_for_remote_address(self):
+        """Эндпоинт метрик закрыт для внешних адресов."""
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 403)
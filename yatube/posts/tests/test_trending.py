@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Follow, Post, TrendingScore, User
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='HaHaHa')
+        cls.reader = User.objects.create_user(username='Alice')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.quiet_post = Post.objects.create(
+            author=cls.reader, text='Пост без подписчиков')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Обсуждаемый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def score(self, post, now=None):
+        return trending.score(TrendingScore.objects.get(post=post).rank, now)
+
+    def test_reach_and_comments_raise_score(self):
+        """Охват автора и комментарии повышают оценку поста."""
+        self.assertAlmostEqual(
+            self.score(self.quiet_post), settings.TRENDING_POST_WEIGHT,
+            places=3)
+        self.assertGreater(self.score(self.post), self.score(self.quiet_post))
+        before = self.score(self.post)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        self.assertAlmostEqual(
+            self.score(self.post),
+            before + settings.TRENDING_COMMENT_WEIGHT,
+            places=3,
+        )
+
+    def test_scores_decay_without_rewrites(self):
+        """Оценки затухают вдвое за период, ранг при этом не меняется."""
+        now = timezone.now()
+        later = now + timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+        rank = TrendingScore.objects.get(post=self.post).rank
+        self.assertAlmostEqual(
+            self.score(self.post, later), self.score(self.post, now) / 2)
+        self.assertEqual(trending.decay(now=later), 0)
+        self.assertEqual(TrendingScore.objects.get(post=self.post).rank, rank)
+
+    def test_comment_reorders_decayed_posts(self):
+        """Комментарий к старому посту сравнивается с затухшей оценкой."""
+        later = timezone.now() + timedelta(
+            hours=settings.TRENDING_HALF_LIFE_HOURS * 3)
+        fresh = Post.objects.create(
+            author=self.reader, text='Свежий пост', pub_date=later)
+        trending.add(fresh.pk, settings.TRENDING_POST_WEIGHT, now=later)
+        self.assertEqual(
+            list(TrendingScore.objects.values_list('post', flat=True)),
+            [fresh.pk, self.post.pk, self.quiet_post.pk],
+        )
+
+    def test_decay_drops_cold(self):
+        """decay_trending удаляет остывшие посты одним запросом."""
+        call_command('decay_trending', verbosity=0)
+        self.assertEqual(TrendingScore.objects.count(), 2)
+        with self.assertNumQueries(1):
+            removed = trending.decay(
+                now=timezone.now() + timedelta(days=30))
+        self.assertEqual(removed, 2)
+        self.assertFalse(TrendingScore.objects.exists())
+
+    def test_trending_page_orders_by_score(self):
+        """Страница "Популярное" выводит посты по убыванию оценки."""
+        response = Client().get(reverse('posts:trending'))
+        self.assertEqual(
+            [score.post for score in response.context['page_obj']],
+            [self.post, self.quiet_post],
+        )
+        self.assertContains(response, self.post.text)
@@ -0,0 +1,124 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.cache import count_key
+from posts.models import Post, User
+from posts.utils import (CachedCountPaginator, cursor_page, decode_cursor,
+                         encode_cursor, page_window)
+from yatube.settings import QUANTITY
+
+POSTS_QUANTITY = 25
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {number}')
+            for number in range(POSTS_QUANTITY)
+        )
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_cursor_roundtrip(self):
+        """Курсор однозначно кодирует дату и id записи."""
+        post = self.ordered[0]
+        self.assertEqual(
+            decode_cursor(encode_cursor(post)), (post.pub_date, post.pk)
+        )
+        self.assertIsNone(decode_cursor('мусор'))
+
+    def test_pages_walk_forward_and_back(self):
+        """Переходы "старее/новее" проходят ленту без пропусков."""
+        queryset = Post.objects.all()
+        first = cursor_page(queryset)
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+        second = cursor_page(queryset, after=first.next_cursor)
+        third = cursor_page(queryset, after=second.next_cursor)
+        self.assertFalse(third.has_next())
+        self.assertEqual(
+            list(first) + list(second) + list(third), self.ordered
+        )
+        back = cursor_page(queryset, before=third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(
+            list(cursor_page(queryset, before=second.previous_cursor)),
+            list(first)
+        )
+
+    def test_index_uses_cursor_without_count(self):
+        """Главная страница отдаёт курсорную страницу без COUNT(*)."""
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.is_cursor)
+        self.assertEqual(len(page_obj), QUANTITY)
+        self.assertContains(response, f'?after={page_obj.next_cursor}')
+        response = self.client.get(
+            reverse('posts:index') + f'?after={page_obj.next_cursor}'
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.ordered[QUANTITY:QUANTITY * 2]
+        )
+
+
+class PageWindowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HaHaHa')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {number}')
+            for number in range(POSTS_QUANTITY)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_page_window(self):
+        """Окно страниц содержит края и соседей текущей страницы."""
+        self.assertEqual(page_window(2, 3), [1, 2, 3])
+        self.assertEqual(page_window(1, 50), [1, 2, 3, None, 50])
+        self.assertEqual(
+            page_window(25, 50), [1, None, 23, 24, 25, 26, 27, None, 50])
+        self.assertEqual(page_window(50, 50), [1, None, 48, 49, 50])
+
+    def test_count_cached_until_post_created(self):
+        """Число постов кешируется и сбрасывается после создания поста."""
+        def paginator():
+            return CachedCountPaginator(
+                Post.objects.all(), QUANTITY, count_key=count_key('posts'))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator().count, POSTS_QUANTITY)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator().count, POSTS_QUANTITY)
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            Post.objects.create(author=self.user, text='Новый пост')
+        # До фиксации транзакции число в кеше не сбрасывается.
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator().count, POSTS_QUANTITY)
+        for (callback,), _ in on_commit.call_args_list:
+            callback()
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator().count, POSTS_QUANTITY + 1)
+
+    def test_profile_uses_post_counter(self):
+        """Профиль берёт число постов из счётчика без COUNT(*)."""
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.user}))
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 1)
+        self.assertEqual(page_obj.page_window, [1])
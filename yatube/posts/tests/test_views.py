@@ -2,6 +2,7 @@ import math
 import shutil
 import tempfile
 from http import HTTPStatus
+from unittest import mock
 
 from django import forms
 from django.conf import settings
@@ -325,6 +326,12 @@ class TestViewsCommentFollow(TestCase):
         )
 
     def setUp(self):
+        # TestCase не выполняет on_commit, а кеш подписок сбрасывается
+        # в нём.
+        on_commit = mock.patch('django.db.transaction.on_commit',
+                               side_effect=lambda callback: callback())
+        on_commit.start()
+        self.addCleanup(on_commit.stop)
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         self.authorized_follower = Client()
@@ -347,6 +354,38 @@ class TestViewsCommentFollow(TestCase):
             response1.context.get('comment'), self.comment
         )
 
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_post_comments_paginated(self):
+        """Комментарии выводятся порциями, следующие - фрагментом."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, text=f'Ответ {number}',
+                    author=self.follower)
+            for number in range(3)
+        )
+        expected = list(self.post.comments.order_by('-created', '-pk'))
+        response = self.authorized_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}))
+        first = response.context['comments']
+        self.assertEqual(list(first), expected[:2])
+        self.assertTrue(first.has_next())
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        self.assertContains(response, f'{url}?after={first.next_cursor}')
+        shown = list(first)
+        cursor = first.next_cursor
+        while cursor:
+            response = self.authorized_client.get(url, {'after': cursor})
+            self.assertTemplateUsed(response, 'includes/comments.html')
+            page = response.context['comments']
+            shown += list(page)
+            cursor = page.next_cursor
+        self.assertEqual(shown, expected)
+
+    def test_post_comments_missing_post(self):
+        """Фрагмент комментариев несуществующего поста отдаёт 404."""
+        response = self.authorized_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, 404)
+
     def test_follower_posts_list_changes(self):
         """Проверка появления нового поста в ленте подписчика
             и его отсутствия в ленте другого пользователя."""
@@ -0,0 +1,101 @@
+"""Фоновая подготовка вариантов изображений постов.
+
+При сохранении поста с новой картинкой пул потоков создаёт её копии
+нескольких ширин в WebP (если Pillow его поддерживает) и JPEG и
+записывает имена файлов в Post.image_variants. Тег {% post_picture %}
+строит из них <picture> со srcset без обращений к хранилищу.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from PIL import features
+from sorl.thumbnail import get_thumbnail
+
+from .cache import bump
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Карточка поста - 960x339 с обрезкой по центру, варианты сохраняют
+# эти пропорции.
+WIDTHS = (320, 640, 960)
+ASPECT = 339 / 960
+FORMATS = ('WEBP', 'JPEG') if features.check('webp') else ('JPEG',)
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+def geometry(width):
+    return f'{width}x{round(width * ASPECT)}'
+
+
+def generate(image_name):
+    """Создаёт варианты изображения: {формат: [(ширина, файл)]}."""
+    return {
+        image_format: [
+            (width, get_thumbnail(
+                image_name, geometry(width), crop='center', upscale=True,
+                format=image_format).name)
+            for width in WIDTHS
+        ]
+        for image_format in FORMATS
+    }
+
+
+def record(post_id, image_name):
+    """Создаёт варианты и сохраняет их в посте.
+
+    Если картинку успели заменить, результат не записывается.
+    """
+    variants = generate(image_name)
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        image_variants=json.dumps(variants), updated=timezone.now())
+    # Карточки лент зависят от Post.updated. Остальные кешированные
+    # страницы до своего сброса выводят миниатюру sorl, что допустимо.
+    if updated:
+        bump(f'post:{post_id}')
+    return variants
+
+
+def _run(post_id, image_name):
+    try:
+        record(post_id, image_name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', image_name)
+    finally:
+        # У каждого потока пула своё соединение с БД хранилища ключей.
+        connection.close()
+        _slots.release()
+
+
+def _get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _slots = threading.BoundedSemaphore(settings.THUMBNAIL_QUEUE_SIZE)
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def schedule(post_id, image_name):
+    """Ставит изображение поста в очередь пула.
+
+    Если очередь заполнена, задача отбрасывается: пост выводится с
+    миниатюрой sorl, пока варианты не создаст generate_thumbnails.
+    """
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        logger.warning('Очередь миниатюр заполнена, пропущено %s', image_name)
+        return False
+    executor.submit(_run, post_id, image_name)
+    return True
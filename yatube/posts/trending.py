@@ -0,0 +1,79 @@
+"""Оценки популярности постов для ленты "Популярное".
+
+Публикация поста даёт ему стартовую оценку, которая растёт с числом
+подписчиков автора (охват), каждый новый комментарий прибавляет
+TRENDING_COMMENT_WEIGHT (скорость обсуждения). Оценка убывает вдвое
+за TRENDING_HALF_LIFE_HOURS.
+
+Вместо оценки хранится ранг log2(оценка) + t, где t - число периодов
+полураспада от начала эпохи до текущего момента. Со временем оценки
+всех постов затухают одинаково, а ранг не меняется, поэтому порядок по
+rank всегда верен без пересчёта строк. Команда decay_trending только
+удаляет остывшие посты одним DELETE по индексу rank.
+"""
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import after_commit, bump, forget_counts
+from .models import TrendingScore, UserStats
+
+SCOPE = 'trending'
+
+
+def periods(now):
+    """Число периодов полураспада от начала эпохи до now."""
+    return now.timestamp() / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def score(rank, now=None):
+    """Оценка на момент now по рангу."""
+    return 2 ** (rank - periods(now or timezone.now()))
+
+
+def add(post_id, weight, now=None):
+    """Прибавляет weight к оценке поста."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        scores = TrendingScore.objects.select_for_update()
+        row, created = scores.get_or_create(
+            post_id=post_id,
+            defaults={'rank': periods(now) + math.log2(weight)})
+        if not created:
+            row.rank = periods(now) + math.log2(score(row.rank, now) + weight)
+            row.save(update_fields=['rank'])
+    after_commit(bump, SCOPE)
+    if created:
+        after_commit(forget_counts, SCOPE)
+
+
+def post_weight(author_id):
+    """Стартовая оценка поста по охвату автора."""
+    followers = UserStats.objects.filter(user=author_id).values_list(
+        'followers_count', flat=True).first() or 0
+    return settings.TRENDING_POST_WEIGHT * (1 + math.log2(1 + followers))
+
+
+def post_published(post):
+    add(post.pk, post_weight(post.author_id), now=post.pub_date)
+
+
+def comment_added(comment):
+    add(comment.post_id, settings.TRENDING_COMMENT_WEIGHT,
+        now=comment.created)
+
+
+def decay(now=None):
+    """Удаляет посты, оценка которых к моменту now ниже минимальной.
+
+    Возвращает число удалённых строк.
+    """
+    now = now or timezone.now()
+    cold = periods(now) + math.log2(settings.TRENDING_MIN_SCORE)
+    removed, _ = TrendingScore.objects.filter(rank__lt=cold).delete()
+    if removed:
+        bump(SCOPE)
+        forget_counts(SCOPE)
+    return removed
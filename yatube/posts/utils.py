@@ -1,9 +1,227 @@
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 from yatube.settings import QUANTITY
+
+from core.routers import primary
+
+from .models import Post
 # QUANTITY = 10
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Сколько номеров страниц показывать вокруг текущей и по краям.
+PAGE_WINDOW = 2
+PAGE_ENDS = 1
 
-def pages(request, args):
-    paginator = Paginator(args, QUANTITY)
+
+def pages(request, args, cursor=False, count=None, count_key=None):
+    """Возвращает страницу ленты.
+
+    При cursor=True используется навигация по курсору без COUNT(*)
+    и OFFSET. Ссылки вида ?page=N продолжают обслуживаться обычным
+    постраничным режимом. В нём число записей берётся из count
+    (денормализованный счётчик) или из кеша по ключу count_key.
+    """
+    if cursor and 'page' not in request.GET:
+        return cursor_page(
+            args,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    paginator = CachedCountPaginator(
+        args, QUANTITY, count=count, count_key=count_key)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    page = paginator.get_page(page_number)
+    page.page_window = page_window(page.number, paginator.num_pages)
+    return page
+
+
+def page_window(number, num_pages, on_each_side=PAGE_WINDOW,
+                on_ends=PAGE_ENDS):
+    """Номера страниц для ссылок: края и окрестность текущей.
+
+    Пропуски обозначаются None.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    window = []
+    if number > on_each_side + on_ends + 1:
+        window += list(range(1, on_ends + 1)) + [None]
+        start = number - on_each_side
+    else:
+        start = 1
+    if number < num_pages - on_each_side - on_ends:
+        window += list(range(start, number + on_each_side + 1)) + [None]
+        window += list(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window += list(range(start, num_pages + 1))
+    return window
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator без COUNT(*) на каждый запрос.
+
+    count - заранее известное число записей, count_key - ключ кеша для
+    результата COUNT(*), который сбрасывают сигналы создания и удаления
+    постов.
+    """
+
+    def __init__(self, object_list, per_page, count=None, count_key=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if self.count_key is None:
+            return Paginator.count.func(self)
+        count = cache.get(self.count_key)
+        if count is None:
+            with primary():
+                count = Paginator.count.func(self)
+            cache.set(self.count_key, count, settings.FEED_CACHE_TIMEOUT)
+        return count
+
+
+def encode_cursor(obj, field='pub_date'):
+    delta = getattr(obj, field) - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+    return f'{micros}_{obj.pk}'
+
+
+def decode_cursor(value):
+    """Разбирает курсор вида '<микросекунды>_<id>'.
+
+    Для некорректного значения возвращает None.
+    """
+    try:
+        micros, pk = value.split('_')
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def latest_cursor(queryset, key, field='pub_date'):
+    """Курсор самой новой записи (пустая строка, если записей нет).
+
+    Хранится в кеше по ключу key, сигналы удаляют его при публикации
+    и удалении постов.
+    """
+    def newest():
+        with primary():
+            obj = queryset.order_by(f'-{field}', '-pk').first()
+        return encode_cursor(obj, field) if obj else ''
+    return cache.get_or_set(key, newest, settings.LATEST_CACHE_TIMEOUT)
+
+
+def new_posts_scope(group_id):
+    """Область кеша и выборка ленты для проверки новых постов.
+
+    group_id - id группы или пустая строка для главной ленты.
+    """
+    if group_id:
+        return f'group:{group_id}', Post.objects.filter(group=group_id)
+    return 'posts', Post.objects.all()
+
+
+def newer_than(queryset, since, key, field='pub_date', limit=QUANTITY):
+    """Записи новее курсора since, новые первыми.
+
+    Возвращает не больше limit записей, курсор самой новой из
+    переданных клиенту и признак того, что новых записей больше limit.
+    Если по кешированному курсору (см. latest_cursor) новых записей
+    нет, база не запрашивается.
+    """
+    since_key = decode_cursor(since)
+    latest = latest_cursor(queryset, key, field)
+    if not latest or decode_cursor(latest) <= since_key:
+        return [], since, False
+    moment, pk = since_key
+    rows = list(queryset.filter(
+        Q(**{f'{field}__gt': moment})
+        | Q(**{field: moment, 'pk__gt': pk})
+    ).order_by(f'-{field}', '-pk')[:limit + 1])
+    if not rows:
+        return [], since, False
+    return rows[:limit], encode_cursor(rows[0], field), len(rows) > limit
+
+
+def cursor_page(queryset, after=None, before=None, field='pub_date',
+                per_page=QUANTITY):
+    """Страница по ключу (field, id) в порядке убывания.
+
+    after - курсор последней записи предыдущей страницы (более старые
+    записи), before - курсор первой записи следующей (более новые).
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+    if after_key is not None:
+        moment, pk = after_key
+        rows = list(queryset.filter(
+            Q(**{f'{field}__lt': moment})
+            | Q(**{field: moment, 'pk__lt': pk})
+        ).order_by(f'-{field}', '-pk')[:per_page + 1])
+        return CursorPage(
+            rows[:per_page], len(rows) > per_page, True, field)
+    if before_key is not None:
+        moment, pk = before_key
+        rows = list(queryset.filter(
+            Q(**{f'{field}__gt': moment})
+            | Q(**{field: moment, 'pk__gt': pk})
+        ).order_by(field, 'pk')[:per_page + 1])
+        if len(rows) > per_page:
+            return CursorPage(rows[:per_page][::-1], True, True, field)
+        # Дошли до начала ленты: отдаём полную первую страницу.
+    rows = list(queryset.order_by(f'-{field}', '-pk')[:per_page + 1])
+    return CursorPage(rows[:per_page], len(rows) > per_page, False, field)
+
+
+class CursorPage:
+    """Страница ленты с навигацией "старее/новее" по курсору."""
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous, field):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.field = field
+
+    def __repr__(self):
+        return f'<CursorPage {self.previous_cursor}..{self.next_cursor}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return encode_cursor(self.object_list[-1], self.field)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return encode_cursor(self.object_list[0], self.field)
+        return None
@@ -1,26 +1,120 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
+from core.queries import query_budget
+from core.routers import etag_from_primary
+
+from .cache import count_key, etag, feed_cache, latest_key
+from .counters import user_stats
+from .feed import feed_page, feed_posts
+from .follows import is_following
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import pages
+from .models import Comment, Follow, Group, Post, TrendingScore, User
+from .search import search
+from .suggestions import for_user as suggestions_for
+from .utils import (
+    cursor_page, decode_cursor, new_posts_scope, newer_than, pages,
+)
+
+
+def index_etag(request):
+    return etag(request, 'posts')
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return None
+    return etag(request, f'group:{group_id}')
+
 
+def post_etag(request, post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id').first()
+    if post is None:
+        return None
+    author_id, group_id = post
+    return etag(request, f'post:{post_id}', f'author:{author_id}',
+                f'group:{group_id}')
 
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return None
+    scopes = [f'author:{author_id}', f'stats:{author_id}']
+    if request.user.is_authenticated:
+        scopes += [f'follow:{request.user.pk}',
+                   f'suggestions:{request.user.pk}']
+    return etag(request, *scopes)
+
+
+@query_budget(4)
+@etag_from_primary
+@condition(etag_func=index_etag)
 def index(request):
-    post_list = Post.objects.select_related('author')
-    page_obj = pages(request, post_list)
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = pages(
+        request, post_list, cursor=True, count_key=count_key('posts'))
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(2)
+def new_posts(request):
+    """Карточки постов новее курсора since для главной или группы.
+
+    Без новых постов отвечает 204; курсор для следующего запроса
+    передаётся в заголовке X-Latest-Cursor.
+    """
+    since = request.GET.get('since')
+    group_id = request.GET.get('group', '')
+    if decode_cursor(since) is None or not (
+            group_id == '' or group_id.isdigit()):
+        return HttpResponseBadRequest()
+    scope, post_list = new_posts_scope(group_id)
+    posts, latest, more = newer_than(
+        post_list.select_related('author', 'group'), since,
+        latest_key(scope))
+    if not posts:
+        response = HttpResponse(status=204)
+    else:
+        response = render(request, 'includes/new_posts.html', {
+            'posts': posts,
+            'more': more,
+        })
+    response['X-Latest-Cursor'] = latest
+    return response
+
+
+@query_budget(3)
+def trending_posts(request):
+    post_list = TrendingScore.objects.select_related(
+        'post__author', 'post__group').order_by('-rank', '-post')
+    page_obj = pages(request, post_list, count_key=count_key('trending'))
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@query_budget(6)
+@etag_from_primary
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    group_list = group.posts.all()
-    page_obj = pages(request, group_list)
+    group_list = group.posts.select_related('author', 'group')
+    page_obj = pages(request, group_list, count=group.posts_count)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -28,9 +122,14 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(5)
+@etag_from_primary
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
+    user_stats(post.author)
+    comments = comments_page(post.pk)
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
@@ -40,22 +139,86 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(post_id, after=None):
+    """Страница комментариев поста, новые первыми, с авторами."""
+    return cursor_page(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        after=after,
+        field='created',
+        per_page=settings.COMMENTS_PER_PAGE,
+    )
+
+
+@query_budget(5)
+@etag_from_primary
+@condition(etag_func=post_etag)
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев.
+
+    Существование поста проверяется, только если страница пуста.
+    """
+    comments = comments_page(post_id, request.GET.get('after'))
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'includes/comments.html', context)
+
+
+@query_budget(7)
+@etag_from_primary
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = pages(request, post_list)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    # Посты читаются только при заполнении фрагмента в шаблоне, поэтому
+    # из основной базы: фрагмент кешируется под текущим поколением.
+    post_list = author.posts.select_related('author', 'group').using(
+        'default')
+    stats = user_stats(author)
+    page_obj = pages(request, post_list, count=stats.posts_count)
+    following = is_following(request.user.pk, author.pk)
     context = {
         'page_obj': page_obj,
         'author': author,
         'following': following,
+        'suggestions': suggestions_for(request.user),
+        **feed_cache(f'author:{author.pk}'),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(5)
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    group = author = None
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+    page_obj = search(
+        query,
+        group_id=group and group.pk,
+        author_id=author and author.pk,
+        after=request.GET.get('after'),
+    )
+    next_query = request.GET.copy()
+    next_query['after'] = page_obj.next_cursor
+    context = {
+        'query': query,
+        'group': group,
+        'author': author,
+        'groups': Group.objects.all(),
+        'page_obj': page_obj,
+        'next_query': next_query.urlencode(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -70,6 +233,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     is_edit = True
     post = get_object_or_404(Post, pk=post_id)
@@ -91,6 +255,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -103,38 +268,42 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(7)
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = pages(request, post_list)
+    if 'page' in request.GET:
+        page_obj = pages(
+            request,
+            feed_posts(request.user).select_related('author', 'group'),
+        )
+    else:
+        page_obj = feed_page(
+            request.user,
+            Post.objects.select_related('author', 'group'),
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
     context = {
         'page_obj': page_obj,
+        'suggestions': suggestions_for(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(
-        user=request.user.id,
-        author=author.id).exists()
-    if following is False and request.user != author:
-        follow = Follow.objects.create(
-            user=request.user,
-            author=author
-        )
-        follow.save()
+    if request.user != author:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', author.username)
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(
+    Follow.objects.filter(
         user=request.user.id,
-        author=author.id)
-    following = follow.exists()
-    if following is True:
-        follow.delete()
+        author=author.id).delete()
     return redirect('posts:index')
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import OutboxMessage
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'recipient', 'subject', 'status', 'attempts',
+                    'send_after', 'sent')
+    search_fields = ('recipient',)
+    list_filter = ('status',)
+    exclude = ('message',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
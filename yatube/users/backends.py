@@ -0,0 +1,16 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from . import outbox
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который ставит письма в очередь OutboxMessage.
+
+    Отправка во время запроса сводится к одной вставке в базу, сами
+    письма отправляет команда send_outbox.
+    """
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        return outbox.enqueue(email_messages)
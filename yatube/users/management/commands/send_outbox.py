@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из очереди OutboxMessage пачками через '
+        'OUTBOX_EMAIL_BACKEND. Без --loop завершается, когда письма, '
+        'которые пора отправить, закончатся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+            help='Писем в пачке (через одно соединение).',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать постоянно, проверяя очередь каждые --interval '
+                 'секунд.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проверками пустой очереди, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        totals = [0, 0, 0]
+        verbosity = options['verbosity']
+        while True:
+            try:
+                counts = outbox.process(options['batch_size'])
+            except Exception as exc:
+                # Постоянный отправитель переживает сбои базы и почты:
+                # взятые письма вернутся в очередь по истечении аренды.
+                if not options['loop']:
+                    raise
+                self.stderr.write(f'Ошибка отправки: {exc}')
+                counts = (0, 0, 0)
+            totals = [total + count for total, count in zip(totals, counts)]
+            if verbosity > 1 and any(counts):
+                self.stdout.write(
+                    'Отправлено: {}, ошибок: {}, отложено: {}.'.format(
+                        *counts))
+            if any(counts):
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        if verbosity:
+            self.stdout.write(self.style.SUCCESS(
+                'Отправлено: {}, ошибок: {}, отложено: {}.'.format(*totals)))
@@ -0,0 +1,74 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """Письмо в очереди на отправку.
+
+    Создаётся бэкендом OutboxEmailBackend вместо отправки во время
+    запроса; отправляет команда send_outbox.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    recipient = models.EmailField(
+        verbose_name='Получатель'
+    )
+    subject = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Тема'
+    )
+    message = models.BinaryField(
+        verbose_name='Письмо',
+        help_text='EmailMessage, сериализованное pickle'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки в очередь'
+    )
+    send_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Отправить не раньше'
+    )
+    sent = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата отправки'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток отправки'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+
+    class Meta:
+        ordering = ['send_after']
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        indexes = [
+            models.Index(
+                fields=['status', 'send_after'], name='outbox_due_idx'
+            ),
+            models.Index(
+                fields=['recipient', '-sent'], name='outbox_recipient_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.recipient}: {self.subject}'
@@ -0,0 +1,181 @@
+"""Очередь исходящих писем.
+
+Запрос только записывает письмо в OutboxMessage, отправляет их
+отдельный процесс (команда send_outbox) через OUTBOX_EMAIL_BACKEND.
+Письмо с несколькими получателями хранится строкой на каждого.
+Письма берутся пачками и уходят через одно соединение с почтовым
+бэкендом. Неудачная отправка повторяется с удваивающейся задержкой.
+Одному получателю письма уходят не чаще раза в
+OUTBOX_RECIPIENT_INTERVAL секунд, остальные откладываются.
+"""
+import pickle
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+def for_recipient(message, recipient):
+    """Копия письма, которая уходит только recipient.
+
+    Заголовки To и Cc остаются как в исходном письме, а адрес доставки
+    задаётся через bcc, который в заголовки не попадает.
+    """
+    copy = pickle.loads(pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+    headers = {'To': message.to, 'Cc': message.cc}
+    copy.extra_headers = {
+        **{name: ', '.join(map(str, values))
+           for name, values in headers.items() if values},
+        **message.extra_headers,
+    }
+    copy.to, copy.cc, copy.bcc = [], [], [recipient]
+    return copy
+
+
+def enqueue(messages):
+    """Ставит письма EmailMessage в очередь.
+
+    Возвращает число писем, а не строк очереди.
+    """
+    rows = []
+    queued = 0
+    for message in messages:
+        recipients = list(dict.fromkeys(message.recipients()))
+        if not recipients:
+            continue
+        # Соединение бэкенда очереди не сериализуется и не нужно
+        # при отправке.
+        message.connection = None
+        for recipient in recipients:
+            if len(recipients) > 1:
+                copy = for_recipient(message, recipient)
+            else:
+                copy = message
+            rows.append(OutboxMessage(
+                recipient=recipient,
+                subject=message.subject[:255],
+                message=pickle.dumps(copy, pickle.HIGHEST_PROTOCOL),
+            ))
+        queued += 1
+    OutboxMessage.objects.bulk_create(rows)
+    return queued
+
+
+def retry_delay(attempts):
+    """Задержка перед следующей попыткой после attempts неудачных."""
+    return timedelta(seconds=min(
+        settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_MAX_RETRY_DELAY,
+    ))
+
+
+def claim(batch_size, now):
+    """Забирает пачку писем, которые пора отправить.
+
+    Выбранные письма откладываются на OUTBOX_LEASE секунд, чтобы их
+    не взял другой процесс; если отправитель упадёт, они вернутся в
+    очередь по истечении этого срока.
+    """
+    with transaction.atomic():
+        due = (
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxMessage.PENDING, send_after__lte=now)
+            .order_by('send_after', 'pk')
+        )
+        messages = list(due[:batch_size])
+        OutboxMessage.objects.filter(
+            pk__in=[message.pk for message in messages]
+        ).update(send_after=now + timedelta(seconds=settings.OUTBOX_LEASE))
+    return messages
+
+
+def throttle(messages, now):
+    """Делит пачку на письма к отправке и отложенные.
+
+    Получателю уходит не больше одного письма за интервал, включая
+    уже отправленные ранее.
+    """
+    interval = timedelta(seconds=settings.OUTBOX_RECIPIENT_INTERVAL)
+    last_sent = dict(
+        OutboxMessage.objects.filter(
+            recipient__in={message.recipient for message in messages},
+            status=OutboxMessage.SENT,
+            sent__gt=now - interval,
+        ).order_by('recipient', 'sent').values_list('recipient', 'sent')
+    )
+    ready, postponed = [], []
+    for message in messages:
+        previous = last_sent.get(message.recipient)
+        if previous is None:
+            ready.append(message)
+            last_sent[message.recipient] = now
+        else:
+            message.send_after = previous + interval
+            postponed.append(message)
+    return ready, postponed
+
+
+def fail(row, exc, now):
+    """Записывает неудачную попытку и назначает следующую."""
+    row.attempts += 1
+    row.last_error = f'{type(exc).__name__}: {exc}'
+    if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        row.status = OutboxMessage.FAILED
+    else:
+        row.send_after = now + retry_delay(row.attempts)
+
+
+def deliver(messages, now):
+    """Отправляет письма через одно соединение и записывает результат.
+
+    Если соединение не открылось, неудачной считается попытка для всей
+    пачки. Возвращает число отправленных и неудачных писем.
+    """
+    sent = failed = 0
+    connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+    try:
+        connection.open()
+    except Exception as exc:
+        for row in messages:
+            fail(row, exc, now)
+        failed = len(messages)
+    else:
+        try:
+            for row in messages:
+                try:
+                    message = pickle.loads(row.message)
+                    message.connection = connection
+                    message.send()
+                except Exception as exc:
+                    fail(row, exc, now)
+                    failed += 1
+                else:
+                    row.status = OutboxMessage.SENT
+                    row.sent = timezone.now()
+                    sent += 1
+        finally:
+            connection.close()
+    OutboxMessage.objects.bulk_update(
+        messages,
+        ['status', 'sent', 'send_after', 'attempts', 'last_error'],
+    )
+    return sent, failed
+
+
+def process(batch_size=None, now=None):
+    """Одна пачка: забрать, учесть ограничение, отправить.
+
+    Возвращает число отправленных, неудачных и отложенных писем.
+    """
+    now = now or timezone.now()
+    messages = claim(batch_size or settings.OUTBOX_BATCH_SIZE, now)
+    if not messages:
+        return 0, 0, 0
+    ready, postponed = throttle(messages, now)
+    OutboxMessage.objects.bulk_update(postponed, ['send_after'])
+    sent, failed = deliver(ready, now) if ready else (0, 0)
+    return sent, failed, len(postponed)
@@ -0,0 +1,141 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import User
+from users import outbox
+from users.models import OutboxMessage
+
+
+@override_settings(
+    EMAIL_BACKEND='users.backends.OutboxEmailBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_RECIPIENT_INTERVAL=60,
+    OUTBOX_RETRY_DELAY=60,
+    OUTBOX_MAX_ATTEMPTS=2,
+)
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='HaHaHa', email='hahaha@example.com',
+            password='Пароль-123')
+
+    def send_mail(self, subject='Тема', to='hahaha@example.com'):
+        mail.send_mail(subject, 'Текст', 'from@example.com', [to])
+
+    def test_password_reset_is_queued(self):
+        """Сброс пароля ставит письмо в очередь, отправляет команда."""
+        response = Client().post(
+            reverse('users:password_reset_form'),
+            {'email': self.user.email},
+        )
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(mail.outbox, [])
+        queued = OutboxMessage.objects.get()
+        self.assertEqual(queued.recipient, self.user.email)
+        call_command('send_outbox', verbosity=0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboxMessage.SENT)
+
+    def test_batch_uses_one_connection(self):
+        """Пачка писем отправляется через одно соединение."""
+        for number in range(3):
+            self.send_mail(to=f'user{number}@example.com')
+        with mock.patch(
+                'django.core.mail.backends.locmem.EmailBackend.open'
+        ) as open_connection:
+            self.assertEqual(outbox.process(), (3, 0, 0))
+        open_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_recipient_throttled(self):
+        """Второе письмо тому же получателю откладывается на интервал."""
+        self.send_mail('Первое')
+        self.send_mail('Второе')
+        now = timezone.now()
+        self.assertEqual(outbox.process(now=now), (1, 0, 1))
+        self.assertEqual(outbox.process(now=now), (0, 0, 0))
+        later = now + timedelta(seconds=61)
+        self.assertEqual(outbox.process(now=later), (1, 0, 0))
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            ['Первое', 'Второе'],
+        )
+
+    def test_failed_send_retried_with_backoff(self):
+        """Ошибка отправки повторяется позже, затем письмо помечается."""
+        self.send_mail()
+        now = timezone.now()
+        with mock.patch(
+                'django.core.mail.backends.locmem.EmailBackend'
+                '.send_messages', side_effect=OSError('down')):
+            self.assertEqual(outbox.process(now=now), (0, 1, 0))
+            queued = OutboxMessage.objects.get()
+            self.assertEqual(queued.status, OutboxMessage.PENDING)
+            self.assertEqual(
+                queued.send_after, now + timedelta(seconds=60))
+            self.assertEqual(outbox.process(now=now), (0, 0, 0))
+            later = now + timedelta(seconds=60)
+            self.assertEqual(outbox.process(now=later), (0, 1, 0))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboxMessage.FAILED)
+        self.assertEqual(queued.attempts, 2)
+        self.assertIn('down', queued.last_error)
+
+    def test_connection_failure_postpones_batch(self):
+        """Если соединение не открылось, вся пачка откладывается."""
+        for number in range(2):
+            self.send_mail(to=f'user{number}@example.com')
+        now = timezone.now()
+        with mock.patch(
+                'django.core.mail.backends.locmem.EmailBackend.open',
+                side_effect=OSError('refused')):
+            self.assertEqual(outbox.process(now=now), (0, 2, 0))
+        for queued in OutboxMessage.objects.all():
+            with self.subTest(recipient=queued.recipient):
+                self.assertEqual(queued.status, OutboxMessage.PENDING)
+                self.assertEqual(queued.attempts, 1)
+                self.assertEqual(
+                    queued.send_after, now + timedelta(seconds=60))
+                self.assertIn('refused', queued.last_error)
+
+    def test_loop_survives_errors(self):
+        """Постоянный отправитель не завершается из-за ошибки."""
+        with mock.patch.object(
+                outbox, 'process',
+                side_effect=[OSError('locked'), KeyboardInterrupt]
+        ) as process, mock.patch('time.sleep'):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('send_outbox', loop=True, verbosity=0,
+                             stderr=StringIO())
+        self.assertEqual(process.call_count, 2)
+
+    def test_each_recipient_queued(self):
+        """Письмо нескольким получателям ставится строкой на каждого."""
+        recipients = ['hahaha@example.com', 'alice@example.com']
+        mail.EmailMessage(
+            'Тема', 'Текст', 'from@example.com', recipients[:1],
+            cc=recipients[1:],
+        ).send()
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list(
+                'recipient', flat=True)),
+            sorted(recipients),
+        )
+        self.assertEqual(outbox.process(), (2, 0, 0))
+        for message in mail.outbox:
+            with self.subTest(recipients=message.recipients()):
+                self.assertEqual(len(message.recipients()), 1)
+                headers = message.message()
+                self.assertEqual(headers['To'], recipients[0])
+                self.assertEqual(headers['Cc'], recipients[1])
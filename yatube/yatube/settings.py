@@ -30,15 +30,19 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.QueryCountMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -48,7 +52,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -66,13 +70,27 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
+# SQLite с WAL, настроенными pragma и BEGIN IMMEDIATE для записи.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
 
+# Реплика для чтения, например копия db.sqlite3 (команда sync_replica).
+if os.getenv('REPLICA_DB_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': 'core.db.backends.sqlite3',
+        'NAME': os.getenv('REPLICA_DB_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает из основной базы.
+REPLICA_STICKY_SECONDS = 10
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,6 +119,11 @@ USE_L10N = True
 USE_TZ = True
 
 QUANTITY = 10
+# Комментариев на странице поста и в каждой догружаемой порции.
+COMMENTS_PER_PAGE = 20
+
+# Авторы с большим числом подписчиков не раскладываются по лентам.
+FEED_CELEBRITY_FOLLOWERS = 1000
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [
@@ -110,16 +133,80 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загруженные изображения уменьшаются и перекодируются (posts.images).
+POST_IMAGE_MAX_SIZE = 1920
+POST_IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+POST_IMAGE_QUALITY = 85
+# Загрузки больше этого размера пишутся во временный файл, а не в память.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+# Временные файлы создаются с правами 0600 и перемещаются в MEDIA_ROOT
+# как есть: без явных прав веб-сервер не сможет их отдать.
+FILE_UPLOAD_PERMISSIONS = 0o644
+
+# Пул потоков для подготовки миниатюр при сохранении поста.
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_QUEUE_SIZE = 100
+THUMBNAIL_BACKEND = 'core.backends.TimedThumbnailBackend'
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь и отправляются командой send_outbox через
+# OUTBOX_EMAIL_BACKEND (локально - в файлы EMAIL_FILE_PATH).
+EMAIL_BACKEND = 'users.backends.OutboxEmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+OUTBOX_BATCH_SIZE = 100
+# Повторы через 1, 2, 4... минуты, не дольше часа, до OUTBOX_MAX_ATTEMPTS.
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_MAX_RETRY_DELAY = 60 * 60
+OUTBOX_MAX_ATTEMPTS = 5
+# Не чаще одного письма получателю за интервал, секунд.
+OUTBOX_RECIPIENT_INTERVAL = 60
+# На сколько секунд письмо закрепляется за отправителем.
+OUTBOX_LEASE = 300
+
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Превышение бюджета запросов view: ошибка вместо предупреждения в логе.
+QUERY_BUDGET_STRICT = False
+
+# Адреса, с которых доступен эндпоинт /metrics/.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Фрагменты лент инвалидируются сигналами, TTL лишь ограничивает объём.
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+# Отрендеренные карточки постов, см. posts/cards.py.
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Курсор самого нового поста для проверки "есть ли новые посты".
+# Короткий срок ограничивает устаревание, если запись в кеш обогнала
+# фиксацию транзакции с новым постом.
+LATEST_CACHE_TIMEOUT = 60
+# Множество авторов, на которых подписан пользователь.
+FOLLOWING_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько рекомендаций подписок хранить на пользователя и выводить.
+SUGGESTIONS_PER_USER = 20
+SUGGESTIONS_SHOWN = 5
+
+# Лента "Популярное": оценка вдвое убывает за TRENDING_HALF_LIFE_HOURS,
+# посты с оценкой ниже TRENDING_MIN_SCORE удаляет decay_trending.
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_POST_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_MIN_SCORE = 0.05
+
+# Общий для всех процессов сервера кеш в файле SQLite. Тесты используют
+# кеш в памяти (core.testing.TestRunner).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.backends.TimedSQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }